@@ -13,6 +13,16 @@ class AgentBase:
         """
         return False
 
+    @property
+    def is_learning_in_get_q(self):
+        """
+        プレイ中の学習フラグ
+        get_qで行動価値Qテーブルなどを更新する(プレイ中に学習する)か
+        並列プレイではワーカーでの更新が反映されないため,Trueのエージェントは並列プレイできない
+        :return: プレイ中の学習フラグ(True:get_qで学習する,False:get_qで学習しない)
+        """
+        return False
+
     def initialize(self):
         """
         初期化実行処理
@@ -88,6 +98,14 @@ class AgentBase:
         :param epochs: エポック数
         :param size_batch: バッチサイズ
         :param number: 出力用のナンバー(fitの実施回数を想定)
+        :return: 損失(ニューラルネットワークの学習を実施しない場合はNone)
+        """
+        return None
+
+    def flush(self):
+        """
+        保存処理
+        学習データを保存して保存待ちの書き込みの終了を待機する
         :return: なし
         """
         pass
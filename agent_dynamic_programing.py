@@ -1,11 +1,16 @@
+import heapq
+import os
+
 import numpy as np
-import tensorflow as tf
 
 from agent_base import AgentBase
+from checkpoint_manager import CheckpointManager
 
 
 class AgentDynamicPrograming(AgentBase):
-    def __init__(self, environment, epsilon=0.1, decay=0.9, eta=0.1, gradient_minimum=0.001, mode_table=True, size=(8, 8)):
+    def __init__(self, environment, epsilon=0.1, decay=0.9, eta=0.1, gradient_minimum=0.001, mode_table=True, size=None,
+                 mode_solver='sweep', interval_save=1, dtype_table=np.float64, mode_memmap=False, directory='data',
+                 backend='tensorflow'):
         """
         コンストラクタ
         :param epsilon: ε-Greedy方策で使用するεの値
@@ -13,49 +18,101 @@ class AgentDynamicPrograming(AgentBase):
         :param eta: 学習率
         :param gradient_minimum: 学習が必要となる最小の勾配
         :param mode_table: テーブルモード選択フラグ(True:テーブルモード,False:ニューラルネットワークモード)
-        :param size: 状態サイズ
+        :param size: 状態サイズ(Noneの場合は環境の(高さ, 幅))
+        :param mode_solver: テーブルモードでの解法('sweep':状態ごとに逐次更新,'vector':全状態を一括で同期更新,
+                            'prioritized':勾配の大きい状態から優先的に更新)
+        :param interval_save: 学習データの保存間隔(fitの実施回数,0以下の場合はflushでのみ保存)
+        :param dtype_table: テーブルモードでの価値Vテーブルの型(np.float64,np.float32,np.float16など)
+        :param mode_memmap: テーブルモードで価値Vテーブルをファイルのメモリマップで保持するかのフラグ
+        :param directory: 学習データの保存先のディレクトリ(エージェントごとのサブディレクトリに保存)
+        :param backend: ニューラルネットワークモードで使用するバックエンド('tensorflow':tf.keras,'numpy':NumpyMLP)
         """
         super().__init__()
         self.__environment = environment
+        if size is None:
+            # 状態サイズの指定がない場合は環境のサイズを使用
+            size = (environment.height, environment.width)
         self.__epsilon = epsilon
         self.__decay = decay
         self.__eta = eta
         self.__gradient_minimum = gradient_minimum
         self.__mode_table = mode_table
+        self.__mode_solver = mode_solver
+        self.__backend = backend
+        self.__transition = None
+        self.__transition_sparse = None
+        # 優先度付きスイープで次回の学習に引き継ぐ情報(価値V,勾配,優先度付きキューと学習後の価値Vテーブル)
+        self.__v_list = None
+        self.__priority = None
+        self.__queue = None
+        self.__v_solved = None
         self.__size = np.array(size)
         self.__count_random_policy = 0
         self.__v_data = np.zeros([self.__size[0], self.__size[1]])
+        # 学習データはバックグラウンドで保存する
+        self.__checkpoint = CheckpointManager(os.path.join(directory, 'dynamic_programing'), interval_save)
 
         if self.__mode_table:
             # テーブルモードの場合
-            try:
-                # テーブルの情報をファイルから読み込み
-                self.__v_data = np.load('data\\dynamic_programing\\v_data.npy')
-            except:
-                # ファイルからの読み込みに失敗した場合
-                pass
+            # テーブルの情報をファイルから読み込み(ファイルがない場合はすべて0で領域を確保)
+            self.__v_data = self.__checkpoint.load_table('v_data.npy', self.__v_data.shape, dtype=dtype_table,
+                                                         mode_memmap=mode_memmap)
         else:
             # ニューラルネットワークモードの場合
-            try:
-                # モデルをファイルから読み込み
-                self.__model = tf.keras.models.load_model('data\\dynamic_programing\\model.hdf5')
-            except:
-                # モデルの読み込みに失敗した場合はモデルを生成
-                self.__model = tf.keras.models.Sequential([tf.keras.layers.Dense(32, input_shape=(2, ), activation='relu'),
-                                                           #tf.keras.layers.Dense(1024, activation='relu'),
-                                                           tf.keras.layers.Dense(32, activation='relu'),
-                                                           tf.keras.layers.Dense(1)])
-                self.__model.compile(optimizer='adam', loss='mse')
-                # 生成したモデルを保存
-                tf.keras.models.save_model(self.__model, 'data\\dynamic_programing\\model.hdf5')
-            # 使用するモデルの概要を出力
-            self.__model.summary()
-            try:
-                # 重みをファイルから読み込み
-                self.__model.load_weights('data\\dynamic_programing\\weights.hdf5')
-            except:
-                # 重みの読み込みに失敗した場合は何もしない
-                pass
+            # モデルは初回の使用時に読み込む(TensorFlowの読み込みも初回の使用時まで遅延する)
+            self.__model = None
+
+    def __get_model(self):
+        """
+        ニューラルネットワークのモデルを取得
+        初回の呼び出し時にモデルと重みをファイルから読み込む(読み込めない場合は生成)
+        TensorFlowのバックエンドの場合はTensorFlowもこの時点で読み込む
+        :return: モデル
+        """
+        if self.__model is not None:
+            # 読み込み済みの場合
+            return self.__model
+
+        if self.__backend == 'numpy':
+            # NumPyのバックエンドの場合はモデルを生成
+            from numpy_mlp import NumpyMLP
+            model = NumpyMLP([2, 32, 32, 1])
+        else:
+            model = self.__load_model_tensorflow()
+        # 使用するモデルの概要を出力
+        model.summary()
+        try:
+            # 重みをファイルから読み込み
+            self.__checkpoint.load_weights(model, 'weights.npz')
+        except:
+            # 重みの読み込みに失敗した場合は何もしない
+            pass
+        self.__model = model
+
+        return model
+
+    def __load_model_tensorflow(self):
+        """
+        TensorFlowのモデルを読み込み
+        モデルをファイルから読み込む(読み込めない場合は生成して保存)
+        :return: モデル
+        """
+        import tensorflow as tf
+
+        try:
+            # モデルをファイルから読み込み
+            model = tf.keras.models.load_model(self.__checkpoint.get_path('model.hdf5'))
+        except:
+            # モデルの読み込みに失敗した場合はモデルを生成
+            model = tf.keras.models.Sequential([tf.keras.layers.Dense(32, input_shape=(2, ), activation='relu'),
+                                                #tf.keras.layers.Dense(1024, activation='relu'),
+                                                tf.keras.layers.Dense(32, activation='relu'),
+                                                tf.keras.layers.Dense(1)])
+            model.compile(optimizer='adam', loss='mse')
+            # 生成したモデルを保存
+            tf.keras.models.save_model(model, self.__checkpoint.get_path('model.hdf5'))
+
+        return model
 
     def get_reward(self, status, action, can_action, status_next, is_play, score, actions_effective_next=None):
         """
@@ -91,8 +148,19 @@ class AgentDynamicPrograming(AgentBase):
         :param epochs: エポック数
         :param size_batch: バッチサイズ
         :param number: 出力用のナンバー(fitの実施回数を想定)
-        :return: なし
+        :return: 損失(ニューラルネットワークの学習を実施しない場合はNone)
         """
+        loss = None
+
+        if self.__mode_table and (self.__mode_solver in ('vector', 'prioritized')):
+            # テーブルモードかつ一括更新または優先度付き更新の場合
+            if self.__mode_solver == 'vector':
+                self.__fit_vector(epochs, number)
+            else:
+                self.__fit_prioritized(epochs, number)
+            # デーブルの各値をファイルに保存
+            self.__save()
+            return loss
 
         train_data = list()
         train_label = list()
@@ -104,7 +172,7 @@ class AgentDynamicPrograming(AgentBase):
                                        self.__size[0] * self.__size[1],
                                        replace=False)
             # スカラー値を座標に変換
-            statuses = (np.array([indices // self.__size[0], indices % self.__size[0]], dtype=np.int)).T
+            statuses = (np.array([indices // self.__size[0], indices % self.__size[0]], dtype=np.int64)).T
 
             if not self.__mode_table:
                 # ニューラルネットワークモードの場合
@@ -116,31 +184,24 @@ class AgentDynamicPrograming(AgentBase):
                 # 有効な行動リストを取得
                 actions = self.__environment.get_actions_effective(status)
 
+                # 各行動での移動先の座標を取得
+                statuses_next = self.__environment.status_next_table[status[1], status[0]]
+
                 v = 0
                 count = 0
-                for action in range(4):
-                    # 移動先の座標を算出
-                    status_next = status.copy()
-                    if action == 0:
-                        status_next[1] -= 1
-                    elif action == 1:
-                        status_next[0] += 1
-                    elif action == 2:
-                        status_next[1] += 1
+                for action in actions:
+                    # 移動先の座標を取得
+                    status_next = statuses_next[action]
+
+                    if (status_next == self.__environment.status_goal).all():
+                        # 行動有効かつ非プレイ中として報酬を取得
+                        reward = self.get_reward(None, None, True, None, False, None, actions_effective_next=actions)
                     else:
-                        status_next[0] -= 1
-
-                    if action in actions:
-                        # 行動が有効行動リストに含まれる場合
-                        if (status_next == np.array([7, 7])).all():
-                            # 行動有効かつ非プレイ中として報酬を取得
-                            reward = self.get_reward(None, None, True, None, False, None, actions_effective_next=actions)
-                        else:
-                            # 行動有効かつプレイ中として報酬を取得
-                            reward = self.get_reward(None, None, True, None, True, None, actions_effective_next=actions)
-                        # 価値Vの値を算出
-                        v += reward + self.__decay * self.__get_v(status_next)
-                        count += 1
+                        # 行動有効かつプレイ中として報酬を取得
+                        reward = self.get_reward(None, None, True, None, True, None, actions_effective_next=actions)
+                    # 価値Vの値を算出
+                    v += reward + self.__decay * self.__get_v(status_next)
+                    count += 1
 
                 # 価値Vを取得
                 data = self.__get_v(status)
@@ -174,38 +235,227 @@ class AgentDynamicPrograming(AgentBase):
         if self.__mode_table:
             # テーブルモードの場合
             # デーブルの各値をファイルに保存
-            np.save('data\\dynamic_programing\\v_data.npy', self.__v_data)
+            self.__save()
         else:
             # ニューラルネットワークモードの場合
             print('{0}回目の学習'.format(number + 1))
             if greater_gradient:
                 # 1つ以上の勾配の傾きが最小勾配より大きい場合
                 # 学習を実施
-                history = self.__model.fit(np.array(train_data), np.array(train_label), epochs=epochs, verbose=0)
-                print('loss:', history.history['loss'][-1])
+                history = self.__get_model().fit(np.array(train_data), np.array(train_label), epochs=epochs, verbose=0)
+                loss = float(history.history['loss'][-1])
+                print('loss:', loss)
                 # 学習した重みをファイルに保存
-                self.__model.save_weights('data\\dynamic_programing\\weights.hdf5')
+                self.__save()
                 # 価値Vテーブルを更新
                 self.__update_v_table()
 
-    def get_v_table(self):
+        return loss
+
+    def flush(self):
         """
-        価値Vのテーブル取得処理
-        価値Vのテーブルを返す(テーブルがない場合は生成も行う)
-        :return: 価値Vテーブル(x座標, y座標)
+        保存処理
+        学習データを保存して保存待ちの書き込みの終了を待機する
+        :return: なし
+        """
+        self.__save(force=True)
+        self.__checkpoint.flush()
+
+    def __save(self, force=False):
+        """
+        学習データの保存処理
+        保存間隔に達した場合にテーブルまたは重みをバックグラウンドで保存する
+        :param force: 保存間隔にかかわらず保存するかのフラグ
+        :return: なし
         """
-        # 戻り値用の領域をすべて0で生成
-        v_data = np.zeros([self.__size[0], self.__size[1]])
         if self.__mode_table:
             # テーブルモードの場合
-            v_data = self.__v_data.copy()
+            self.__checkpoint.save(lambda: {'v_data.npy': self.__v_data}, force)
         else:
             # ニューラルネットワークモードの場合
-            for i in range(v_data.shape[0]):
-                for j in range(v_data.shape[1]):
-                    v_data[i, j] = self.__get_v((i, j))
+            if self.__model is not None:
+                # モデルを読み込み済みの場合(読み込んでいない場合は重みが変わっていないため保存しない)
+                self.__checkpoint.save(lambda: {'weights.npz': self.__model.get_weights()}, force)
 
-        return v_data
+    def __fit_vector(self, epochs, number):
+        """
+        全状態の価値Vを一括で同期更新する学習処理
+        すべての状態の価値Vの変化量の最大値が最小勾配以下となった時点で終了する
+        :param epochs: エポック数(最大の更新回数)
+        :param number: 出力用のナンバー(fitの実施回数を想定)
+        :return: なし
+        """
+        status_next, actions_effective, reward, count = self.__get_transition()
+        v = self.__v_data.reshape(-1)
+
+        for i in range(epochs):
+            # 有効な行動の報酬と移動先の価値Vから価値Vを算出
+            q = reward + self.__decay * v[status_next]
+            v_new = np.where(actions_effective, q, 0).sum(axis=1) / count
+            # 勾配の最大値を算出
+            gradient = np.abs(v_new - v).max()
+            v = v_new
+
+            if (i + 1) % 100 == 0:
+                print('ループ数：{0}  エポック数：{1} / {2}'.format(number, i + 1, epochs))
+
+            if gradient <= self.__gradient_minimum:
+                # すべての勾配の傾きが最小勾配以下の場合
+                print('ループ数：{0}  エポック数：{1} / {2}'.format(number, i + 1, epochs))
+                break
+
+        # テーブルの領域はそのまま使用する
+        self.__v_data[...] = v.reshape(self.__v_data.shape)
+
+    def __fit_prioritized(self, epochs, number):
+        """
+        優先度付きスイープによる学習処理
+        勾配が最大の状態から順に価値Vを更新して,更新した状態の遷移元の状態のみ勾配を再計算する
+        すべての状態の勾配が最小勾配以下となった時点で終了する
+        価値V,勾配と優先度付きキューは次回の学習に引き継ぎ,2回目以降は前回の学習後に価値Vが変化した状態と
+        その遷移元の状態のみ勾配を再計算する(初回のみ全状態の勾配を一括で算出する)
+        :param epochs: エポック数(全状態数 * エポック数を最大の更新回数とする)
+        :param number: 出力用のナンバー(fitの実施回数を想定)
+        :return: なし
+        """
+        reward_mean, transition, decay_count, previous = self.__get_transition_sparse()
+        count_status = len(transition)
+        v_data = self.__v_data.reshape(-1)
+
+        # 1状態ずつの更新はPythonのリストで処理する(NumPyの要素アクセスより高速なため)
+        gradient_minimum = self.__gradient_minimum
+        if self.__v_solved is None:
+            # 初回の場合は全状態の勾配を一括で算出
+            status_next, actions_effective, reward, count = self.__get_transition()
+            v = v_data.astype(np.float64)
+            v_next = np.array(reward_mean) + np.where(actions_effective, v[status_next], 0).sum(axis=1) \
+                * np.array(decay_count)
+            priority = np.abs(v_next - v)
+            priority[priority <= gradient_minimum] = 0
+            v = v.tolist()
+            priority = priority.tolist()
+            queue = [(-priority[status], status) for status in range(count_status) if 0 < priority[status]]
+            heapq.heapify(queue)
+            self.__v_solved = v_data.copy()
+        else:
+            # 2回目以降は前回の学習後に価値Vが変化した状態とその遷移元の状態のみ勾配を再計算
+            v, priority, queue = self.__v_list, self.__priority, self.__queue
+            changed = np.flatnonzero(v_data != self.__v_solved)
+            for status, value in zip(changed.tolist(), v_data[changed].tolist()):
+                v[status] = value
+            statuses = set(changed.tolist())
+            for status in changed.tolist():
+                statuses.update(previous[status])
+            for status in statuses:
+                gradient = abs(reward_mean[status] + decay_count[status] * sum(v[j] for j in transition[status])
+                               - v[status])
+                if gradient_minimum < gradient:
+                    # 勾配の傾きが最小勾配より大きい場合は優先度を更新
+                    if gradient != priority[status]:
+                        priority[status] = gradient
+                        heapq.heappush(queue, (-gradient, status))
+                else:
+                    priority[status] = 0
+
+        updated = set()
+        count_update = 0
+        count_update_max = epochs * count_status
+        while queue and (count_update < count_update_max):
+            gradient, status = heapq.heappop(queue)
+            if -gradient != priority[status]:
+                # 優先度が更新済みの場合
+                continue
+
+            # 価値Vを更新
+            v[status] = reward_mean[status] + decay_count[status] * sum(v[j] for j in transition[status])
+            priority[status] = 0
+            updated.add(status)
+            count_update += 1
+
+            # 遷移元の状態の勾配を再計算
+            for status_previous in previous[status]:
+                gradient = abs(reward_mean[status_previous]
+                               + decay_count[status_previous] * sum(v[j] for j in transition[status_previous])
+                               - v[status_previous])
+                if (gradient_minimum < gradient) and (gradient != priority[status_previous]):
+                    # 勾配の傾きが最小勾配より大きい場合は優先度を更新
+                    priority[status_previous] = gradient
+                    heapq.heappush(queue, (-gradient, status_previous))
+
+        print('ループ数：{0}  更新回数：{1} / {2}'.format(number, count_update, count_update_max))
+
+        # 更新した状態のみテーブルに書き込む(テーブルの領域はそのまま使用する)
+        updated = np.array(sorted(updated), dtype=np.int64)
+        v_data[updated] = [v[status] for status in updated.tolist()]
+        self.__v_solved[updated] = v_data[updated]
+        self.__v_list, self.__priority, self.__queue = v, priority, queue
+
+    def __get_transition_sparse(self):
+        """
+        状態遷移の疎な情報を取得
+        優先度付きスイープの1状態ずつの更新で使用するPythonのリストを初回の呼び出し時に__get_transitionから作成する
+        :return: 報酬の期待値(状態数), 状態ごとの有効な行動での移動先の状態のリスト(状態数),
+                 減衰率 / 有効な行動の数(状態数), 状態ごとの遷移元の状態のリスト(状態数)
+        """
+        if self.__transition_sparse is None:
+            # 未作成の場合
+            status_next, actions_effective, reward, count = self.__get_transition()
+            count_status = status_next.shape[0]
+            # 各状態での報酬の期待値(各行動を等確率で選択する方策)
+            reward_mean = np.where(actions_effective, reward, 0).sum(axis=1) / count
+
+            # 有効な行動での移動先の状態を状態ごとに分割(CSR形式のインデックス)
+            indptr = np.concatenate([[0], np.cumsum(actions_effective.sum(axis=1))]).tolist()
+            indices = status_next[actions_effective]
+            indices_list = indices.tolist()
+            transition = [indices_list[begin:end] for begin, end in zip(indptr[:-1], indptr[1:])]
+
+            # 遷移元の状態を状態ごとに分割(転置した行列のインデックス)
+            rows = np.repeat(np.arange(count_status), np.diff(indptr))
+            indptr_previous = np.concatenate([[0], np.cumsum(np.bincount(indices, minlength=count_status))]).tolist()
+            indices_previous = rows[np.argsort(indices, kind='stable')].tolist()
+            previous = [indices_previous[begin:end] for begin, end in zip(indptr_previous[:-1], indptr_previous[1:])]
+
+            self.__transition_sparse = (reward_mean.tolist(), transition, (self.__decay / count).tolist(), previous)
+
+        return self.__transition_sparse
+
+    def __get_transition(self):
+        """
+        状態遷移の情報を取得
+        状態は1次元のインデックス(y座標 * 幅 + x座標)で表し,初回の呼び出し時に環境の遷移先テーブルから作成する
+        :return: 移動先の状態(状態数, 4), 行動の有効性(状態数, 4), 報酬(状態数, 4), 有効な行動の数(状態数)
+        """
+        if self.__transition is None:
+            # 未作成の場合
+            width = self.__size[1]
+            status_next_table = self.__environment.status_next_table.reshape(-1, 4, 2)
+            actions_effective = self.__environment.actions_effective_table.reshape(-1, 4)
+            status_next = status_next_table[:, :, 1] * width + status_next_table[:, :, 0]
+            count = actions_effective.sum(axis=1)
+
+            # ゴールへの移動か(非プレイ中)と行き止まりかの組み合わせごとの報酬をget_rewardから取得
+            rewards = np.array([[self.get_reward(None, None, True, None, is_play, None,
+                                                 actions_effective_next=[0] if is_dead_end else [0, 1])
+                                 for is_dead_end in (False, True)]
+                                for is_play in (False, True)])
+            goal = self.__environment.status_goal
+            is_play = status_next != goal[1] * width + goal[0]
+            reward = rewards[is_play.astype(np.int64), (count <= 1).astype(np.int64)[:, np.newaxis]]
+
+            self.__transition = (status_next, actions_effective, reward, np.maximum(count, 1))
+
+        return self.__transition
+
+    def get_v_table(self):
+        """
+        価値Vのテーブル取得処理
+        価値Vのテーブルを返す(テーブルがない場合は生成も行う)
+        :return: 価値Vテーブル(x座標, y座標)
+        """
+        # テーブルモードとニューラルネットワークモードのいずれも価値Vテーブルの複製を返す
+        # (ニューラルネットワークモードでは__update_v_tableで全状態の価値Vを算出済みのため)
+        return self.__v_data.copy()
 
     def __update_v_table(self):
         """
@@ -214,9 +464,9 @@ class AgentDynamicPrograming(AgentBase):
         """
         if not self.__mode_table:
             # ニューラルネットワークモードの場合
-            statuses = np.array([(i, j) for i in range(8) for j in range(8)])
+            statuses = np.array([(i, j) for i in range(self.__size[0]) for j in range(self.__size[1])])
 
-            v = self.__model.predict(np.array(statuses))
+            v = self.__get_model().predict(np.array(statuses))
             self.__v_data = v.reshape([self.__v_data.shape[0], self.__v_data.shape[1]])
 
     def __get_v(self, status_next):
@@ -1,60 +1,173 @@
+import os
 import sys
 
 import numpy as np
-import tensorflow as tf
 
 from agent_base import AgentBase
+from checkpoint_manager import CheckpointManager
+from experience_buffer import ExperienceBuffer
 
 
 class AgentMonteCarlo(AgentBase):
-    def __init__(self, epsilon=0.1, decay=0.9, mode_table=True, size=(8, 8), count_random_policy=0):
+    def __init__(self, epsilon=0.1, decay=0.9, mode_table=True, size=None, count_random_policy=0,
+                 mode_multi_head=False, environment=None, interval_save=1, dtype_table=np.float64, mode_memmap=False,
+                 directory='data', backend='tensorflow'):
         """
         コンストラクタ
         :param epsilon: ε-Greedy方策で使用するεの値
         :param decay: 行動価値Qを算出する際の減衰率
         :param mode_table: テーブルモード選択フラグ(True:テーブルモード,False:ニューラルネットワークモード)
-        :param size: 状態サイズ
+        :param size: 状態サイズ(Noneの場合は環境の(高さ, 幅),sizeとenvironmentのいずれかの指定が必要)
         :param count_random_policy: ランダム方策実施回数
+        :param mode_multi_head: 多出力モード選択フラグ(True:状態から全行動の行動価値Qを1回で出力,False:状態と行動から行動価値Qを出力)
+        :param environment: 環境(状態サイズの取得と,ニューラルネットワークモードで全状態の行動価値Qを一括で推論する場合に
+                            有効行動の参照に使用)
+        :param interval_save: 学習データの保存間隔(fitの実施回数,0以下の場合はflushでのみ保存)
+        :param dtype_table: テーブルモードでの行動価値Qテーブルの型(np.float64,np.float32,np.float16など)
+        :param mode_memmap: テーブルモードで行動価値Qテーブルをファイルのメモリマップで保持するかのフラグ
+        :param directory: 学習データの保存先のディレクトリ(エージェントごとのサブディレクトリに保存)
+        :param backend: ニューラルネットワークモードで使用するバックエンド('tensorflow':tf.keras,'numpy':NumpyMLP)
         """
         super().__init__()
+        if size is None:
+            # 状態サイズの指定がない場合は環境のサイズを使用
+            if environment is None:
+                raise ValueError('状態サイズ(size)または環境(environment)を指定してください')
+            size = (environment.height, environment.width)
+        self.__environment = environment
         self.__epsilon = epsilon
         self.__decay = decay
         self.__mode_table = mode_table
         self.__size = size
         self.__count_random_policy = count_random_policy
+        self.__mode_multi_head = mode_multi_head
+        self.__backend = backend
+        # 学習データはバックグラウンドで保存する
+        self.__checkpoint = CheckpointManager(os.path.join(directory, 'monte_carlo'), interval_save)
 
         if self.__mode_table:
             # テーブルモードの場合
-            try:
-                # テーブルの情報をファイルから読み込み
-                self.__q_data = np.load('data\\monte_carlo\\q_data.npy')
-                self.__q_count = np.load('data\\monte_carlo\\q_count.npy')
-            except:
-                # ファイルからの読み込みに失敗した場合はすべて0で領域を確保
-                self.__q_data = np.zeros([self.__size[0], self.__size[1], 4])
-                self.__q_count = np.ones(self.__q_data.shape)
+            # テーブルの情報をファイルから読み込み(ファイルがない場合は行動価値Qは0,回数は1で領域を確保)
+            # 回数は精度が必要なため型の指定によらずnp.float64とする
+            shape = [self.__size[0], self.__size[1], 4]
+            self.__set_q_data(self.__checkpoint.load_table('q_data.npy', shape, dtype=dtype_table,
+                                                           mode_memmap=mode_memmap))
+            self.__q_count = self.__checkpoint.load_table('q_count.npy', shape, fill=1.0, mode_memmap=mode_memmap)
         else:
             # ニューラルネットワークモードの場合
-            try:
-                # モデルをファイルから読み込み
-                self.__model = tf.keras.models.load_model('data\\monte_carlo\\model.hdf5')
-            except:
-                # モデルの読み込みに失敗した場合はモデルを生成
-                self.__model = tf.keras.models.Sequential([tf.keras.layers.Dense(16, input_shape=(7, ), activation='relu'),
-                                                           tf.keras.layers.Dense(128, activation='relu'),
-                                                           tf.keras.layers.Dense(16, activation='relu'),
-                                                           tf.keras.layers.Dense(1)])
-                self.__model.compile(optimizer='adam', loss='mse')
-                # 生成したモデルを保存
-                tf.keras.models.save_model(self.__model, 'data\\monte_carlo\\model.hdf5')
-            # 使用するモデルの概要を出力
-            self.__model.summary()
-            try:
-                # 重みをファイルから読み込み
-                self.__model.load_weights('data\\monte_carlo\\weights.hdf5')
-            except:
-                # 重みの読み込みに失敗した場合は何もしない
-                pass
+            if self.__mode_multi_head:
+                # 多出力モードの場合
+                self.__path_model = self.__checkpoint.get_path('model_multi_head.hdf5')
+                self.__name_weights = 'weights_multi_head.npz'
+            else:
+                # 多出力モードでない場合
+                self.__path_model = self.__checkpoint.get_path('model.hdf5')
+                self.__name_weights = 'weights.npz'
+
+            # モデルは初回の使用時に読み込む(TensorFlowの読み込みも初回の使用時まで遅延する)
+            self.__model = None
+            # 行動価値Qテーブルは初回の参照時に推論する(未推論の状態はNaN)
+            self.__set_q_data(np.full([self.__size[0], self.__size[1], 4], np.nan))
+
+    def __get_model(self):
+        """
+        ニューラルネットワークのモデルを取得
+        初回の呼び出し時にモデルと重みをファイルから読み込む(読み込めない場合は生成)
+        TensorFlowのバックエンドの場合はTensorFlowもこの時点で読み込む
+        :return: モデル
+        """
+        if self.__model is not None:
+            # 読み込み済みの場合
+            return self.__model
+
+        if self.__mode_multi_head:
+            # 多出力モードの場合は状態と有効行動を入力して各行動の行動価値Qを出力
+            size_input = 6
+            size_output = 4
+        else:
+            # 多出力モードでない場合は状態と行動と有効行動を入力して行動価値Qを出力
+            size_input = 7
+            size_output = 1
+
+        if self.__backend == 'numpy':
+            # NumPyのバックエンドの場合はモデルを生成
+            from numpy_mlp import NumpyMLP
+            model = NumpyMLP([size_input, 16, 128, 16, size_output])
+        else:
+            model = self.__load_model_tensorflow(size_input, size_output)
+        # 使用するモデルの概要を出力
+        model.summary()
+        try:
+            # 重みをファイルから読み込み
+            self.__checkpoint.load_weights(model, self.__name_weights)
+        except:
+            # 重みの読み込みに失敗した場合は何もしない
+            pass
+        self.__model = model
+
+        return model
+
+    def __load_model_tensorflow(self, size_input, size_output):
+        """
+        TensorFlowのモデルを読み込み
+        モデルをファイルから読み込む(読み込めない場合は生成して保存)
+        :param size_input: 入力数
+        :param size_output: 出力数
+        :return: モデル
+        """
+        import tensorflow as tf
+
+        try:
+            # モデルをファイルから読み込み
+            model = tf.keras.models.load_model(self.__path_model)
+        except:
+            # モデルの読み込みに失敗した場合はモデルを生成
+            model = tf.keras.models.Sequential([tf.keras.layers.Dense(16, input_shape=(size_input, ), activation='relu'),
+                                                tf.keras.layers.Dense(128, activation='relu'),
+                                                tf.keras.layers.Dense(16, activation='relu'),
+                                                tf.keras.layers.Dense(size_output)])
+            model.compile(optimizer='adam', loss='mse')
+            # 生成したモデルを保存
+            tf.keras.models.save_model(model, self.__path_model)
+
+        return model
+
+    def __getstate__(self):
+        """
+        シリアライズする状態を取得
+        並列プレイのワーカーに複製を渡すため,ニューラルネットワークのモデルは除外する(行動価値Qテーブルで行動を選択する)
+        :return: 状態
+        """
+        if (not self.__mode_table) and (self.__environment is not None) and np.isnan(self.__q_data).any():
+            # ニューラルネットワークモードで未推論の状態が存在する場合はワーカーでモデルを使用しないように推論しておく
+            self.__update_q_table()
+        state = self.__dict__.copy()
+        state['_AgentMonteCarlo__model'] = None
+        # メモリマップのテーブルはファイル名のみを渡す
+        state['_AgentMonteCarlo__q_data'] = CheckpointManager.get_state_table(self.__q_data)
+        state['_AgentMonteCarlo__q_flat'] = None
+        state['_AgentMonteCarlo__q_count'] = CheckpointManager.get_state_table(state.get('_AgentMonteCarlo__q_count'))
+        return state
+
+    def __setstate__(self, state):
+        """
+        シリアライズした状態から復元
+        :param state: 状態
+        :return: なし
+        """
+        self.__dict__.update(state)
+        self.__set_q_data(CheckpointManager.set_state_table(self.__q_data))
+        self.__q_count = CheckpointManager.set_state_table(self.__q_count)
+
+    def __set_q_data(self, q_data):
+        """
+        行動価値Qテーブルを設定
+        状態IDで参照するための1次元の状態のテーブル(同じ領域を参照)も設定する
+        :param q_data: 行動価値Qテーブル(y座標, x座標, 行動)
+        :return: なし
+        """
+        self.__q_data = q_data
+        self.__q_flat = q_data.reshape(-1, 4)
 
     def get_action(self, status, actions_effective):
         """
@@ -72,15 +185,8 @@ class AgentMonteCarlo(AgentBase):
             # εと比較するための値を取得
             value = np.random.rand()
 
-            # 現在の状態における各行動での最大の行動価値Qを取得処理
-            q_max = self.__get_q(status, 0, actions_effective)
-            action = 0
-            for i in range(1, 4):
-                q = self.__get_q(status, i, actions_effective)
-                if q_max < q:
-                    # 今までの中で最大の行動価値Qを記憶
-                    q_max = q
-                    action = i
+            # 現在の状態における各行動の行動価値Qを一括で取得して最大となる行動を選択
+            action = int(np.argmax(self.__get_q_all(status, actions_effective)))
 
             if value < self.__epsilon:
                 # ランダムで行動を決定する場合
@@ -123,69 +229,86 @@ class AgentMonteCarlo(AgentBase):
         :param epochs: エポック数
         :param size_batch: バッチサイズ
         :param number: 出力用のナンバー(fitの実施回数を想定)
-        :return: なし
+        :return: 損失(ニューラルネットワークの学習を実施しない場合はNone)
         """
+        loss = None
         if experience is not None:
             # 学習データが存在する場合
             # 1回のプレイの経験のみを使用する
             # テーブルモードであれば複数プレイのデータを使用しても問題ないが,ニューラルネットワークモードの場合は
             # 手数と減衰率から行動価値Qの値がプレイによって大きく異なることにより,学習が進まない可能性があるため.
             experience = experience[0][0]
-            q = 0
-            count = len(experience['status'])
+            status = experience['status']
+            action = experience['action']
+            # 各ステップの行動価値Q(割引報酬和)を一括で算出
+            q = ExperienceBuffer.get_return(experience['reward'], self.__decay)
             if self.__mode_table:
                 # テーブルモードの場合
                 # 行動価値Qを蓄積するテーブルを作成
                 q_total = np.zeros(self.__q_data.shape)
                 q_delta_counter = np.zeros(self.__q_data.shape)
-            else:
-                # ニューラルネットワークモードの場合
-                # 学習データを格納するリストを作成
-                train_data = list()
-                train_label = list()
-
-            for i in range(count):
-                # 新しい経験のデータから処理を実施
-                status = experience['status'][-1 * i]
-                actions_effective_one_hot = np.zeros([4])
-                actions_effective_one_hot[experience['actions_effective'][-1 * i]] = 1
-                action = experience['action'][-1 * i]
-                # 行動価値Qを算出
-                q = experience['reward'][-1 * i] + self.__decay * q
-                if self.__mode_table:
-                    # テーブルモードの場合
-                    q_total[status[1], status[0], action] += q
-                    q_delta_counter[status[1], status[0], action] += 1
-                else:
-                    # ニューラルネットワークモードの場合
-                    is_register = False
-                    for j in range(len(train_data)):
-                        if train_data[j] == (status[1], status[0], action, actions_effective_one_hot[0], actions_effective_one_hot[1], actions_effective_one_hot[2], actions_effective_one_hot[3]):
-                            # 登録済みのステータスと行動の組み合わせの場合
-                            is_register = True
-                            break
-
-                    if not is_register:
-                        # 未登録のステータスと行動の組み合わせの場合
-                        train_data.append((status[1], status[0], action, actions_effective_one_hot[0], actions_effective_one_hot[1], actions_effective_one_hot[2], actions_effective_one_hot[3]))
-                        train_label.append(q)
+                np.add.at(q_total, (status[:, 1], status[:, 0], action), q)
+                np.add.at(q_delta_counter, (status[:, 1], status[:, 0], action), 1)
 
-            if self.__mode_table:
-                # テーブルモードの場合
-                # 各状態,行動での行動価値Qの平均を算出
+                # 各状態,行動での行動価値Qの平均を算出(テーブルの領域はそのまま使用する)
                 q_total += self.__q_data * self.__q_count
                 self.__q_count += q_delta_counter
-                self.__q_data = q_total / self.__q_count
+                self.__q_data[...] = q_total / self.__q_count
 
                 # デーブルの各値をファイルに保存
-                np.save('data\\monte_carlo\\q_data.npy', self.__q_data)
-                np.save('data\\monte_carlo\\q_count.npy', self.__q_count)
+                self.__save()
             else:
                 # ニューラルネットワークモードの場合
+                # 状態,行動,有効行動の組み合わせごとに最初に訪問したステップのみを学習データとする
+                train_data = np.column_stack([status[:, 1], status[:, 0], action, experience['actions_effective']])
+                _, first = np.unique(train_data, axis=0, return_index=True)
+                first = np.sort(first)
+                train_data = train_data[first].astype(np.float64)
+                train_label = q[first]
+
+                if self.__mode_multi_head:
+                    # 多出力モードの場合
+                    # 選択した行動以外の出力は現在の予測値を教師データとする
+                    inputs = np.delete(train_data, 2, axis=1)
+                    train_label_all = self.__get_model().predict(inputs)
+                    train_label_all[np.arange(train_label.shape[0]), train_data[:, 2].astype(np.int64)] = train_label
+                    train_data = inputs
+                    train_label = train_label_all
+
                 # 学習を実施
-                self.__model.fit(np.array(train_data), np.array(train_label), epochs=epochs)
+                history = self.__get_model().fit(train_data, train_label, epochs=epochs)
+                loss = float(history.history['loss'][-1])
                 # 学習した重みをファイルに保存
-                self.__model.save_weights('data\\monte_carlo\\weights.hdf5')
+                self.__save()
+                # 行動価値Qテーブルを更新
+                self.__update_q_table()
+
+        return loss
+
+    def flush(self):
+        """
+        保存処理
+        学習データを保存して保存待ちの書き込みの終了を待機する
+        :return: なし
+        """
+        self.__save(force=True)
+        self.__checkpoint.flush()
+
+    def __save(self, force=False):
+        """
+        学習データの保存処理
+        保存間隔に達した場合にテーブルまたは重みをバックグラウンドで保存する
+        :param force: 保存間隔にかかわらず保存するかのフラグ
+        :return: なし
+        """
+        if self.__mode_table:
+            # テーブルモードの場合
+            self.__checkpoint.save(lambda: {'q_data.npy': self.__q_data, 'q_count.npy': self.__q_count}, force)
+        else:
+            # ニューラルネットワークモードの場合
+            if self.__model is not None:
+                # モデルを読み込み済みの場合(読み込んでいない場合は重みが変わっていないため保存しない)
+                self.__checkpoint.save(lambda: {self.__name_weights: self.__model.get_weights()}, force)
 
     def get_q_table(self, get_actions_effective):
         """
@@ -194,63 +317,107 @@ class AgentMonteCarlo(AgentBase):
         :param get_actions_effective: 有効行動リスト取得ハンドラ
         :return: 行動価値Qテーブル(x座標, y座標, 行動)
         """
-        # 戻り値用の領域をすべて0で生成
-        q_data = np.zeros([self.__size[0], self.__size[1], 4])
-        if self.__mode_table:
-            # テーブルモードの場合
-            q_data = self.__q_data.copy()
-        else:
+        if (not self.__mode_table) and np.isnan(self.__q_data).any():
+            # ニューラルネットワークモードで未推論の状態が存在する場合
+            self.__update_q_table(get_actions_effective)
+
+        return self.__q_data.copy()
+
+    def __update_q_table(self, get_actions_effective=None):
+        """
+        行動価値Qテーブルを更新
+        ニューラルネットワークモードの場合にすべての状態と行動の行動価値Qを一括で推論して保持する
+        有効行動を参照できない場合は未推論(NaN)とし,各状態の初回参照時に推論する
+        :param get_actions_effective: 有効行動リスト取得ハンドラ(Noneの場合は環境から取得)
+        :return: なし
+        """
+        if not self.__mode_table:
             # ニューラルネットワークモードの場合
-            for i in range(q_data.shape[0]):
-                for j in range(q_data.shape[1]):
-                    for k in range(q_data.shape[2]):
-                        q_data[i, j, k] = self.__get_q((i, j), k, get_actions_effective((i, j)))
+            self.__set_q_data(np.full([self.__size[0], self.__size[1], 4], np.nan))
+            if (get_actions_effective is None) and (self.__environment is not None):
+                # 環境が指定されている場合
+                get_actions_effective = self.__environment.get_actions_effective
 
-        return q_data
+            if get_actions_effective is not None:
+                # 有効行動を参照できる場合
+                statuses = list()
+                actions_effective_one_hot = list()
+                for i in range(self.__size[0]):
+                    for j in range(self.__size[1]):
+                        statuses.append((i, j))
+                        actions_effective_one_hot.append(self.__get_one_hot(get_actions_effective((j, i))))
+                q = self.__predict(np.array(statuses), np.array(actions_effective_one_hot))
+                self.__set_q_data(q.reshape(self.__q_data.shape))
 
-    def __get_q(self, status, action, actions_effective):
+    def __get_q_all(self, status, actions_effective):
         """
         行動価値Q取得処理
-        行動価値Qを算出して返す
-        :param status: 状態
-        :param action: 行動
+        状態での各行動の行動価値Qを一括で算出して返す
+        :param status: 状態(位置または状態ID)
         :param actions_effective: 有効行動リスト
-        :return: 行動価値Q
+        :return: 各行動の行動価値Q(4)
         """
-        q = 0
-        if self.__mode_table:
-            # テーブルモードの場合
-            q = self.__q_data[status[1], status[0], action]
+        # ニューラルネットワークモードの場合も学習ごとに更新した行動価値Qテーブルを参照
+        if isinstance(status, int):
+            # 状態IDの場合
+            q = self.__q_flat[status]
         else:
-            # ニューラルネットワークモードの場合
-            actions_effective_one_hot = np.zeros([4])
-            actions_effective_one_hot[actions_effective] = 1
-            q = self.__model.predict(np.array([status[1], status[0], action, actions_effective_one_hot[0], actions_effective_one_hot[1], actions_effective_one_hot[2], actions_effective_one_hot[3]])[np.newaxis, :])[0][0]
+            q = self.__q_data[status[1], status[0]]
+        if (not self.__mode_table) and np.isnan(q[0]):
+            # ニューラルネットワークモードで未推論の状態の場合
+            if self.__environment is not None:
+                # 環境が指定されている場合は全状態を一括で推論
+                self.__update_q_table()
+                q = self.__q_flat[status] if isinstance(status, int) else self.__q_data[status[1], status[0]]
+            else:
+                # 状態(y座標, x座標)を推論してテーブルに設定
+                y, x = divmod(status, int(self.__size[1])) if isinstance(status, int) else (status[1], status[0])
+                q[:] = self.__predict(np.array([(y, x)]), self.__get_one_hot(actions_effective)[np.newaxis, :])[0]
 
         return q
 
+    def __predict(self, statuses, actions_effective_one_hot):
+        """
+        ニューラルネットワークによる推論処理
+        複数の状態の各行動の行動価値Qを1回の推論で算出する
+        :param statuses: 状態(状態数, 2)(y座標, x座標の順)
+        :param actions_effective_one_hot: 有効行動(状態数, 4)(1:有効,0:無効)
+        :return: 各行動の行動価値Q(状態数, 4)
+        """
+        if self.__mode_multi_head:
+            # 多出力モードの場合
+            q = self.__get_model().predict(np.concatenate([statuses, actions_effective_one_hot], axis=1))
+        else:
+            # 多出力モードでない場合は状態と各行動の組み合わせを入力
+            inputs = np.concatenate([statuses.repeat(4, axis=0),
+                                     np.tile(np.arange(4), statuses.shape[0])[:, np.newaxis],
+                                     actions_effective_one_hot.repeat(4, axis=0)], axis=1)
+            q = self.__get_model().predict(inputs)
+
+        return q.reshape(-1, 4)
+
+    @staticmethod
+    def __get_one_hot(actions_effective):
+        """
+        有効行動リストをone-hot表現に変換
+        :param actions_effective: 有効行動リスト
+        :return: 有効行動(4)(1:有効,0:無効)
+        """
+        actions_effective_one_hot = np.zeros([4])
+        actions_effective_one_hot[actions_effective] = 1
+
+        return actions_effective_one_hot
+
     def get_q_table_experience(self, experience):
         experience = experience[0][0]
-        q = 0
-        count = len(experience['status'])
+        status = experience['status']
+        action = experience['action']
+        # 各ステップの行動価値Q(割引報酬和)を一括で算出
+        q = ExperienceBuffer.get_return(experience['reward'], self.__decay)
         q_data = np.zeros([self.__size[0], self.__size[1], 4])
-        train_data = list()
-
-        for i in range(count):
-            status = experience['status'][-1 * i]
-            action = experience['action'][-1 * i]
-            q = experience['reward'][-1 * i] + self.__decay * q
-
-            is_register = False
-            for j in range(len(train_data)):
-                if train_data[j] == (status[1], status[0], action):
-                    # 登録済みのステータスと行動の組み合わせの場合
-                    is_register = True
-                    break
-
-            if not is_register:
-                # 未登録のステータスと行動の組み合わせの場合
-                train_data.append((status[1], status[0], action))
-                q_data[status[1], status[0], action] = q
+
+        # 状態と行動の組み合わせごとに最初に訪問したステップの値を設定
+        _, first = np.unique(np.stack([status[:, 1], status[:, 0], action], axis=1), axis=0, return_index=True)
+        q_data[status[first, 1], status[first, 0], action[first]] = q[first]
 
         return q_data
@@ -7,5 +7,5 @@ class AgentRandom(AgentBase):
     def __init__(self):
         super().__init__()
 
-    def get_action(self, status):
+    def get_action(self, status, actions_effective=None, is_previous=False):
         return np.random.randint(0, 4)
@@ -1,13 +1,17 @@
 import os
 
 import numpy as np
-import tensorflow as tf
 
 from agent_base import AgentBase
+from checkpoint_manager import CheckpointManager
+from experience_buffer import ExperienceBuffer
+from replay_memory import ReplayMemory
 
 
 class AgentTD(AgentBase):
-    def __init__(self, environment, mode_sarsa, epsilon=0.1, decay=0.9, eta=0.1, gradient_minimum=0.001, mode_table=True, size=(8, 8), count_random_policy=0):
+    def __init__(self, environment, mode_sarsa, epsilon=0.1, decay=0.9, eta=0.1, gradient_minimum=0.001, mode_table=True, size=None, count_random_policy=0,
+                 mode_multi_head=False, capacity_replay=0, count_train_per_step=1, interval_train=0, interval_save=1,
+                 dtype_table=np.float64, mode_memmap=False, directory='data', backend='tensorflow'):
         """
         コンストラクタ
         :param environment: 環境
@@ -17,11 +21,24 @@ class AgentTD(AgentBase):
         :param eta: 学習率
         :param gradient_minimum: 学習が必要となる最小の勾配
         :param mode_table: テーブルモード選択フラグ(True:テーブルモード,False:ニューラルネットワークモード)
-        :param size: 状態サイズ
+        :param size: 状態サイズ(Noneの場合は環境の(高さ, 幅))
         :param count_random_policy: ランダム方策実施回数
+        :param mode_multi_head: 多出力モード選択フラグ(True:状態から全行動の行動価値Qを1回で出力,False:状態と行動から行動価値Qを出力)
+        :param capacity_replay: ニューラルネットワークモードで優先度付き経験再生に使用するメモリの容量(0の場合は経験再生しない)
+        :param count_train_per_step: 経験再生での1ステップあたりの学習回数(ミニバッチ数)
+        :param interval_train: ニューラルネットワークモードでオンライン学習する間隔(ステップ数,0の場合はオンライン学習しない)
+                               指定したステップ数ごとにget_qで算出した行動価値Qをミニバッチとして1回だけ学習する
+        :param interval_save: 学習データの保存間隔(fitの実施回数,0以下の場合はflushでのみ保存)
+        :param dtype_table: テーブルモードでの行動価値Qテーブルの型(np.float64,np.float32,np.float16など)
+        :param mode_memmap: テーブルモードで行動価値Qテーブルをファイルのメモリマップで保持するかのフラグ
+        :param directory: 学習データの保存先のディレクトリ(エージェントごとのサブディレクトリに保存)
+        :param backend: ニューラルネットワークモードで使用するバックエンド('tensorflow':tf.keras,'numpy':NumpyMLP)
         """
         super().__init__()
         self.__environment = environment
+        if size is None:
+            # 状態サイズの指定がない場合は環境のサイズを使用
+            size = (environment.height, environment.width)
         self.__mode_sarsa = mode_sarsa
         self.__epsilon = epsilon
         self.__decay = decay
@@ -30,56 +47,118 @@ class AgentTD(AgentBase):
         self.__mode_table = mode_table
         self.__size = np.array(size)
         self.__count_random_policy = count_random_policy
+        self.__mode_multi_head = mode_multi_head
+        self.__count_train_per_step = count_train_per_step
+        self.__interval_train = 0 if self.__mode_table else interval_train
+        # オンライン学習のミニバッチ(状態(y座標, x座標),行動,行動価値Q)
+        self.__batch_status = np.zeros([self.__interval_train, 2], dtype=np.int64)
+        self.__batch_action = np.zeros(self.__interval_train, dtype=np.int64)
+        self.__batch_q = np.zeros(self.__interval_train)
+        self.__count_batch = 0
+        # 前回のfitから今回のfitまでのオンライン学習の損失の合計と学習回数
+        self.__loss_online = 0.0
+        self.__count_loss_online = 0
+        self.__backend = backend
+        self.__memory = None
+        if (not self.__mode_table) and (0 < capacity_replay):
+            # ニューラルネットワークモードかつ経験再生する場合
+            self.__memory = ReplayMemory(capacity_replay)
         self.__action = None
-        path_directory = 'data\\td'
+        # 学習データはバックグラウンドで保存する
+        self.__checkpoint = CheckpointManager(os.path.join(directory, 'td'), interval_save)
 
         if self.__mode_table:
             # テーブルモードの場合
             if self.__mode_sarsa:
                 # SARSAモードの場合
-                self.__path_data = os.path.join(path_directory, "q_data_sarsa.npy")
+                self.__name_data = 'q_data_sarsa.npy'
             else:
                 # SARSAモードでない場合
-                self.__path_data = os.path.join(path_directory, "q_data.npy")
-
-            try:
-                # テーブルの情報をファイルから読み込み
-                self.__q_data = np.load(self.__path_data)
-            except:
-                # ファイルからの読み込みに失敗した場合はすべて0で領域を確保
-                self.__q_data = np.zeros([self.__size[0], self.__size[1], 4])
+                self.__name_data = 'q_data.npy'
+
+            # テーブルの情報をファイルから読み込み(ファイルがない場合はすべて0で領域を確保)
+            self.__set_q_data(self.__checkpoint.load_table(self.__name_data, [self.__size[0], self.__size[1], 4],
+                                                           dtype=dtype_table, mode_memmap=mode_memmap))
         else:
             # ニューラルネットワークモードの場合
+            suffix = ''
             if self.__mode_sarsa:
                 # SARSAモードの場合
-                self.__path_model = os.path.join(path_directory, "model_sarsa.hdf5")
-                self.__path_weights = os.path.join(path_directory, "weights_sarsa.hdf5")
-            else:
-                # SARSAモードでない場合
-                self.__path_model = os.path.join(path_directory, "model.hdf5")
-                self.__path_weights = os.path.join(path_directory, "weights.hdf5")
-
-            try:
-                # モデルをファイルから読み込み
-                self.__model = tf.keras.models.load_model(self.__path_model)
-            except:
-                # モデルの読み込みに失敗した場合はモデルを生成
-                self.__model = tf.keras.models.Sequential([tf.keras.layers.Dense(16, input_shape=(3, ), activation='relu'),
-                                                           tf.keras.layers.Dense(128, activation='relu'),
-                                                           tf.keras.layers.Dense(16, activation='relu'),
-                                                           tf.keras.layers.Dense(1)])
-                self.__model.compile(optimizer='adam', loss='mse')
-                # 生成したモデルを保存
-                tf.keras.models.save_model(self.__model, self.__path_model)
-            # 使用するモデルの概要を出力
-            self.__model.summary()
-
-            try:
-                # 重みをファイルから読み込み
-                self.__model.load_weights(self.__path_weights)
-            except:
-                # 重みの読み込みに失敗した場合は何もしない
-                pass
+                suffix += '_sarsa'
+            if self.__mode_multi_head:
+                # 多出力モードの場合
+                suffix += '_multi_head'
+            self.__path_model = self.__checkpoint.get_path('model{0}.hdf5'.format(suffix))
+            self.__name_weights = 'weights{0}.npz'.format(suffix)
+
+            # モデルは初回の使用時に読み込む(TensorFlowの読み込みも初回の使用時まで遅延する)
+            self.__model = None
+            # 行動価値Qテーブルは初回の参照時に推論する
+            self.__set_q_data(None)
+
+    def __get_model(self):
+        """
+        ニューラルネットワークのモデルを取得
+        初回の呼び出し時にモデルと重みをファイルから読み込む(読み込めない場合は生成)
+        TensorFlowのバックエンドの場合はTensorFlowもこの時点で読み込む
+        :return: モデル
+        """
+        if self.__model is not None:
+            # 読み込み済みの場合
+            return self.__model
+
+        if self.__mode_multi_head:
+            # 多出力モードの場合は状態を入力して各行動の行動価値Qを出力
+            size_input = 2
+            size_output = 4
+        else:
+            # 多出力モードでない場合は状態と行動を入力して行動価値Qを出力
+            size_input = 3
+            size_output = 1
+
+        if self.__backend == 'numpy':
+            # NumPyのバックエンドの場合はモデルを生成
+            from numpy_mlp import NumpyMLP
+            model = NumpyMLP([size_input, 16, 128, 16, size_output])
+        else:
+            model = self.__load_model_tensorflow(size_input, size_output)
+        # 使用するモデルの概要を出力
+        model.summary()
+
+        try:
+            # 重みをファイルから読み込み
+            self.__checkpoint.load_weights(model, self.__name_weights)
+        except:
+            # 重みの読み込みに失敗した場合は何もしない
+            pass
+        self.__model = model
+
+        return model
+
+    def __load_model_tensorflow(self, size_input, size_output):
+        """
+        TensorFlowのモデルを読み込み
+        モデルをファイルから読み込む(読み込めない場合は生成して保存)
+        :param size_input: 入力数
+        :param size_output: 出力数
+        :return: モデル
+        """
+        import tensorflow as tf
+
+        try:
+            # モデルをファイルから読み込み
+            model = tf.keras.models.load_model(self.__path_model)
+        except:
+            # モデルの読み込みに失敗した場合はモデルを生成
+            model = tf.keras.models.Sequential([tf.keras.layers.Dense(16, input_shape=(size_input, ), activation='relu'),
+                                                tf.keras.layers.Dense(128, activation='relu'),
+                                                tf.keras.layers.Dense(16, activation='relu'),
+                                                tf.keras.layers.Dense(size_output)])
+            model.compile(optimizer='adam', loss='mse')
+            # 生成したモデルを保存
+            tf.keras.models.save_model(model, self.__path_model)
+
+        return model
 
     @property
     def mode_sarsa(self):
@@ -89,6 +168,53 @@ class AgentTD(AgentBase):
         """
         return self.__mode_sarsa
 
+    @property
+    def is_learning_in_get_q(self):
+        """
+        プレイ中の学習フラグ
+        テーブルモードとオンライン学習する場合はget_qで学習する
+        :return: プレイ中の学習フラグ(True:get_qで学習する,False:get_qで学習しない)
+        """
+        return self.__mode_table or (0 < self.__interval_train)
+
+    def __getstate__(self):
+        """
+        シリアライズする状態を取得
+        並列プレイのワーカーに複製を渡すため,ニューラルネットワークのモデルは除外する(行動価値Qテーブルで行動を選択する)
+        :return: 状態
+        """
+        state = self.__dict__.copy()
+        state['_AgentTD__model'] = None
+        # 経験再生のメモリはワーカーで使用しないため除外
+        state['_AgentTD__memory'] = None
+        # ワーカーではオンライン学習しない(学習結果は反映されないため)
+        state['_AgentTD__interval_train'] = 0
+        state['_AgentTD__count_batch'] = 0
+        # メモリマップのテーブルはファイル名のみを渡す(未推論の場合はワーカーでモデルを使用しないように推論しておく)
+        state['_AgentTD__q_data'] = CheckpointManager.get_state_table(self.__get_q_data())
+        state['_AgentTD__q_flat'] = None
+
+        return state
+
+    def __setstate__(self, state):
+        """
+        シリアライズした状態から復元
+        :param state: 状態
+        :return: なし
+        """
+        self.__dict__.update(state)
+        self.__set_q_data(CheckpointManager.set_state_table(self.__q_data))
+
+    def __set_q_data(self, q_data):
+        """
+        行動価値Qテーブルを設定
+        状態IDで参照するための1次元の状態のテーブル(同じ領域を参照)も設定する
+        :param q_data: 行動価値Qテーブル(y座標, x座標, 行動)
+        :return: なし
+        """
+        self.__q_data = q_data
+        self.__q_flat = None if q_data is None else q_data.reshape(-1, 4)
+
     def get_action(self, status, actions_effective, is_previous=False):
         """
         行動取得処理
@@ -112,15 +238,8 @@ class AgentTD(AgentBase):
                 # εと比較するための値を取得
                 value = np.random.rand()
 
-                # 現在の状態における各行動での最大の行動価値Qを取得処理
-                q_max = self.__get_q(status, 0, None)
-                action = 0
-                for i in range(1, 4):
-                    q = self.__get_q(status, i, None)
-                    if q_max < q:
-                        # 今までの中で最大の行動価値Qを記憶
-                        q_max = q
-                        action = i
+                # 現在の状態における各行動の行動価値Qを一括で取得して最大となる行動を選択
+                action = int(np.argmax(self.__get_q_all(status, None)))
 
                 if value < self.__epsilon:
                     # ランダムで行動を決定する場合
@@ -167,26 +286,38 @@ class AgentTD(AgentBase):
         :param reward: 報酬
         :return: 行動価値Q
         """
-        q = self.__get_q(status, action, None)
+        q = self.__get_q_all(status, None)[action]
 
-        q_next = 0
+        # 次の状態での各行動の行動価値Qを一括で取得
+        q_next_all = self.__get_q_all(status_next, None)
         if self.__mode_sarsa:
             # SARSAモードの場合
-            q_next = self.__get_q(status_next, action_next, None)
+            q_next = q_next_all[action_next]
         else:
             # SARSAモードでない場合
             # 次の状態での最大の行動価値Qを取得
-            for i in range(4):
-                q_next_tmp = self.__get_q(status_next, i, None)
-                if q_next < q_next_tmp:
-                    q_next = q_next_tmp
+            q_next = max(0, q_next_all.max())
 
         q = q + self.__eta * ((reward + self.__decay * q_next) - q)
 
         if self.__mode_table:
             # テーブルモードの場合
             # 行動価値Qを更新
-            self.__q_data[status[1], status[0], action] = q
+            if isinstance(status, int):
+                # 状態IDの場合
+                self.__q_flat[status, action] = q
+            else:
+                self.__q_data[status[1], status[0], action] = q
+        elif 0 < self.__interval_train:
+            # オンライン学習する場合
+            # ミニバッチに追加して学習間隔に達した場合は学習
+            self.__batch_status[self.__count_batch] = \
+                divmod(status, int(self.__size[1])) if isinstance(status, int) else (status[1], status[0])
+            self.__batch_action[self.__count_batch] = action
+            self.__batch_q[self.__count_batch] = q
+            self.__count_batch += 1
+            if self.__interval_train <= self.__count_batch:
+                self.__fit_online()
 
         return q
 
@@ -198,38 +329,169 @@ class AgentTD(AgentBase):
         :param epochs: エポック数
         :param size_batch: バッチサイズ
         :param number: 出力用のナンバー(fitの実施回数を想定)
-        :return: なし
+        :return: 損失(ニューラルネットワークの学習を実施しない場合はNone)
         """
+        loss = None
 
         if self.__mode_table:
             # テーブルモードの場合
             # デーブルの各値をファイルに保存
-            np.save(self.__path_data, self.__q_data)
+            self.__save()
         elif experience is not None:
             # ニューラルネットワークモードかつ学習データが存在する場合
-            # 1回のプレイの経験のみを使用する
-            # テーブルモードであれば複数プレイのデータを使用しても問題ないが,ニューラルネットワークモードの場合は
-            # 手数と減衰率から行動価値Qの値がプレイによって大きく異なることにより,学習が進まない可能性があるため.
-            experience = experience[0][0]
-            q = 0
-            count = len(experience['status'])
-            # 学習データを格納するリストを作成
-            train_data = list()
-            train_label = list()
-
-            for i in range(count):
-                # 新しい経験のデータから処理を実施
-                status = experience['status'][-1 * i]
-                action = experience['action'][-1 * i]
-                q = experience['q'][-1 * i]
-
-                train_data.append((status[1], status[0], action))
-                train_label.append(q)
-
-            # 学習を実施
-            self.__model.fit(np.array(train_data), np.array(train_label), epochs=epochs)
+            if self.__memory is not None:
+                # 経験再生する場合
+                loss = self.__fit_replay(experience[0], size_batch)
+            elif 0 < self.__interval_train:
+                # オンライン学習する場合
+                # プレイ中に学習済みのため,学習間隔に満たない残りのミニバッチのみ学習する
+                if 0 < self.__count_batch:
+                    self.__fit_online()
+                # 前回のfitからのオンライン学習の損失の平均を返す
+                if 0 < self.__count_loss_online:
+                    loss = self.__loss_online / self.__count_loss_online
+                self.__loss_online = 0.0
+                self.__count_loss_online = 0
+            else:
+                # 経験再生しない場合
+                # 1回のプレイの経験のみを使用する
+                # テーブルモードであれば複数プレイのデータを使用しても問題ないが,ニューラルネットワークモードの場合は
+                # 手数と減衰率から行動価値Qの値がプレイによって大きく異なることにより,学習が進まない可能性があるため.
+                experience = experience[0][0]
+                # 経験の配列から学習データを作成
+                status = experience['status']
+                train_data = np.stack([status[:, 1], status[:, 0], experience['action']], axis=1)
+                train_label = experience['q']
+                if self.__mode_multi_head:
+                    # 多出力モードの場合
+                    # 選択した行動以外の出力は現在の予測値を教師データとする
+                    train_label_all = self.__get_model().predict(train_data[:, :2])
+                    train_label_all[np.arange(train_label.shape[0]), train_data[:, 2]] = train_label
+                    train_data = train_data[:, :2]
+                    train_label = train_label_all
+
+                # 学習を実施
+                history = self.__get_model().fit(train_data, train_label, epochs=epochs)
+                loss = float(history.history['loss'][-1])
             # 学習した重みをファイルに保存
-            self.__model.save_weights(self.__path_weights)
+            self.__save()
+            # 行動価値Qテーブルを更新
+            self.__update_q_table()
+
+        return loss
+
+    def flush(self):
+        """
+        保存処理
+        学習データを保存して保存待ちの書き込みの終了を待機する
+        :return: なし
+        """
+        self.__save(force=True)
+        self.__checkpoint.flush()
+
+    def __save(self, force=False):
+        """
+        学習データの保存処理
+        保存間隔に達した場合にテーブルまたは重みをバックグラウンドで保存する
+        :param force: 保存間隔にかかわらず保存するかのフラグ
+        :return: なし
+        """
+        if self.__mode_table:
+            # テーブルモードの場合
+            self.__checkpoint.save(lambda: {self.__name_data: self.__q_data}, force)
+        else:
+            # ニューラルネットワークモードの場合
+            if self.__model is not None:
+                # モデルを読み込み済みの場合(読み込んでいない場合は重みが変わっていないため保存しない)
+                self.__checkpoint.save(lambda: {self.__name_weights: self.__model.get_weights()}, force)
+
+    def __fit_replay(self, experience, size_batch):
+        """
+        優先度付き経験再生による学習処理
+        経験をメモリに追加し,追加したステップ数 * 1ステップあたりの学習回数だけミニバッチで学習する
+        (経験はプレイの終了後にまとめて渡されるため,ステップごとではなくfitの時点で学習回数分まとめて学習する)
+        TD誤差の目標値(次の状態の行動価値Q)は学習前の行動価値Qテーブル(学習中は固定)から算出し,
+        TD誤差による優先度と選択した行動以外の教師データはミニバッチごとに現在のモデルで推論した行動価値Qから算出する
+        :param experience: 経験(ExperienceBuffer)
+        :param size_batch: バッチサイズ
+        :return: 最後のミニバッチの損失
+        """
+        self.__memory.add(experience.get('status'),
+                          experience.get('action'),
+                          experience.get('reward'),
+                          experience.get('status_next'),
+                          experience.get('action_next'),
+                          experience.get('is_done'))
+
+        count_train = max(1, int(experience.count_step * self.__count_train_per_step))
+        q_data = self.__get_q_data()
+        loss = 0
+        for i in range(count_train):
+            indices, weights, status, action, reward, status_next, action_next, is_done = self.__memory.sample(size_batch)
+
+            # 次の状態での行動価値Qを取得
+            q_next_all = q_data[status_next[:, 1], status_next[:, 0]]
+            if self.__mode_sarsa:
+                # SARSAモードの場合
+                q_next = q_next_all[np.arange(size_batch), action_next]
+            else:
+                # SARSAモードでない場合
+                q_next = np.maximum(0, q_next_all.max(axis=1))
+            # プレイ終了時は次の状態の行動価値Qを加算しない
+            target = reward + self.__decay * q_next * ~is_done
+
+            # 現在のモデルで推論した行動価値QとのTD誤差で優先度を更新
+            q = self.__predict(np.stack([status[:, 1], status[:, 0]], axis=1))
+            self.__memory.update_priority(indices, target - q[np.arange(size_batch), action])
+
+            if self.__mode_multi_head:
+                # 多出力モードの場合
+                # 選択した行動以外の出力は現在の行動価値Qを教師データとする
+                train_data = np.stack([status[:, 1], status[:, 0]], axis=1)
+                train_label = q.copy()
+                train_label[np.arange(size_batch), action] = target
+            else:
+                # 多出力モードでない場合
+                train_data = np.stack([status[:, 1], status[:, 0], action], axis=1)
+                train_label = target
+
+            loss = self.__get_model().train_on_batch(train_data, train_label, sample_weight=weights)
+
+        print('学習回数：{0}  loss：{1}'.format(count_train, loss))
+
+        return float(loss)
+
+    def __fit_online(self):
+        """
+        オンライン学習処理
+        蓄積したミニバッチで1回だけ学習し,ミニバッチに含まれる状態のみ行動価値Qテーブルを更新する
+        (全状態の行動価値Qはfitの時点で更新する)
+        :return: 更新前の損失
+        """
+        count = self.__count_batch
+        self.__count_batch = 0
+        status = self.__batch_status[:count]
+        action = self.__batch_action[:count]
+        train_label = self.__batch_q[:count]
+        if self.__mode_multi_head:
+            # 多出力モードの場合
+            # 選択した行動以外の出力は現在の行動価値Qを教師データとする
+            train_data = status
+            train_label_all = self.__get_q_data()[status[:, 0], status[:, 1]]
+            train_label_all[np.arange(count), action] = train_label
+            train_label = train_label_all
+        else:
+            # 多出力モードでない場合
+            train_data = np.column_stack([status, action])
+
+        loss = float(self.__get_model().train_on_batch(train_data, train_label))
+        self.__loss_online += loss
+        self.__count_loss_online += 1
+        # 次のステップから学習後の行動価値Qを参照するように,ミニバッチに含まれる状態の行動価値Qのみ更新
+        statuses = np.unique(status, axis=0)
+        self.__get_q_data()[statuses[:, 0], statuses[:, 1]] = self.__predict(statuses)
+
+        return loss
 
     def get_q_table(self, get_actions_effective):
         """
@@ -238,61 +500,81 @@ class AgentTD(AgentBase):
         :param get_actions_effective: 有効行動リスト取得ハンドラ
         :return: 行動価値Qテーブル(x座標, y座標, 行動)
         """
-        # 戻り値用の領域をすべて0で生成
-        q_data = np.zeros([self.__size[0], self.__size[1], 4])
-        if self.__mode_table:
-            # テーブルモードの場合
-            q_data = self.__q_data.copy()
-        else:
+        # ニューラルネットワークモードの場合は学習ごとに更新済みのテーブルを返す
+        return self.__get_q_data().copy()
+
+    def __get_q_data(self):
+        """
+        行動価値Qテーブルを取得
+        ニューラルネットワークモードで未推論の場合は全状態を推論する
+        :return: 行動価値Qテーブル
+        """
+        if self.__q_data is None:
+            # 未推論の場合
+            self.__update_q_table()
+
+        return self.__q_data
+
+    def __update_q_table(self):
+        """
+        行動価値Qテーブルを更新
+        ニューラルネットワークモードの場合にすべての状態と行動の行動価値Qを一括で推論して保持する
+        :return: なし
+        """
+        if not self.__mode_table:
             # ニューラルネットワークモードの場合
-            for i in range(q_data.shape[0]):
-                for j in range(q_data.shape[1]):
-                    for k in range(q_data.shape[2]):
-                        q_data[i, j, k] = self.__get_q((i, j), k, None)
+            statuses = np.array([(i, j) for i in range(self.__size[0]) for j in range(self.__size[1])])
 
-        return q_data
+            self.__set_q_data(self.__predict(statuses).reshape([self.__size[0], self.__size[1], 4]))
 
-    def __get_q(self, status, action, actions_effective):
+    def __get_q_all(self, status, actions_effective):
         """
         行動価値Q取得処理
-        行動価値Qを算出して返す
-        :param status: 状態
-        :param action: 行動
+        状態での各行動の行動価値Qを一括で算出して返す
+        :param status: 状態(位置または状態ID)
         :param actions_effective: 有効行動リスト
-        :return: 行動価値Q
+        :return: 各行動の行動価値Q(4)
         """
-        q = 0
-        if self.__mode_table:
-            # テーブルモードの場合
-            q = self.__q_data[status[1], status[0], action]
+        # ニューラルネットワークモードの場合も学習ごとに更新した行動価値Qテーブルを参照
+        if self.__q_data is None:
+            # 未推論の場合
+            self.__update_q_table()
+
+        if isinstance(status, int):
+            # 状態IDの場合
+            return self.__q_flat[status]
+
+        return self.__q_data[status[1], status[0]]
+
+    def __predict(self, statuses):
+        """
+        ニューラルネットワークによる推論処理
+        複数の状態の各行動の行動価値Qを1回の推論で算出する
+        :param statuses: 状態(状態数, 2)(y座標, x座標の順)
+        :return: 各行動の行動価値Q(状態数, 4)
+        """
+        # 学習の途中で少数の状態を推論するため,呼び出しごとの処理の少ないpredict_on_batchで推論する
+        if self.__mode_multi_head:
+            # 多出力モードの場合
+            q = self.__get_model().predict_on_batch(statuses)
         else:
-            # ニューラルネットワークモードの場合
-            q = self.__model.predict(np.array([status[1], status[0], action])[np.newaxis, :])[0][0]
+            # 多出力モードでない場合は状態と各行動の組み合わせを入力
+            inputs = np.concatenate([statuses.repeat(4, axis=0),
+                                     np.tile(np.arange(4), statuses.shape[0])[:, np.newaxis]], axis=1)
+            q = self.__get_model().predict_on_batch(inputs)
 
-        return q
+        return np.asarray(q, dtype=np.float64).reshape(-1, 4)
 
     def get_q_table_experience(self, experience):
         experience = experience[0][0]
-        q = 0
-        count = len(experience['status'])
+        status = experience['status']
+        action = experience['action']
+        # 各ステップの行動価値Q(割引報酬和)を一括で算出
+        q = ExperienceBuffer.get_return(experience['reward'], self.__decay)
         q_data = np.zeros([self.__size[0], self.__size[1], 4])
-        train_data = list()
-
-        for i in range(count):
-            status = experience['status'][-1 * i]
-            action = experience['action'][-1 * i]
-            q = experience['reward'][-1 * i] + self.__decay * q
-
-            is_register = False
-            for j in range(len(train_data)):
-                if train_data[j] == (status[1], status[0], action):
-                    # 登録済みのステータスと行動の組み合わせの場合
-                    is_register = True
-                    break
-
-            if not is_register:
-                # 未登録のステータスと行動の組み合わせの場合
-                train_data.append((status[1], status[0], action))
-                q_data[status[1], status[0], action] = q
+
+        # 状態と行動の組み合わせごとに最初に訪問したステップの値を設定
+        _, first = np.unique(np.stack([status[:, 1], status[:, 0], action], axis=1), axis=0, return_index=True)
+        q_data[status[first, 1], status[first, 0], action[first]] = q[first]
 
         return q_data
@@ -5,7 +5,7 @@ class AgentUser(AgentBase):
     def __init__(self):
         super().__init__()
 
-    def get_action(self, status):
+    def get_action(self, status, actions_effective=None, is_previous=False):
         while True:
             action = input('アクションを選択してください(0:上,1:右,2:下,3:左):')
 
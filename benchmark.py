@@ -0,0 +1,299 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from control import Control
+from maze_generator import MazeGenerator
+
+
+class Benchmark:
+    def __init__(self, sizes=(8, 32, 128), repeat=3, seed=0, mode_network=False):
+        """
+        コンストラクタ
+        迷路のサイズを変えながら各処理の処理速度を計測する
+        :param sizes: 計測する迷路のサイズ(幅と高さ)のリスト
+        :param repeat: 各計測の繰り返し回数(最良値を採用)
+        :param seed: 乱数のシード
+        :param mode_network: ニューラルネットワークモードの学習も計測するかのフラグ
+        """
+        self.__sizes = sizes
+        self.__repeat = repeat
+        self.__seed = seed
+        self.__mode_network = mode_network
+        self.__results = dict()
+        self.__directory_work = None
+        # 学習データを保存する可能性のある作成済みのエージェント(削除前に保存待ちの書き込みを待機する)
+        self.__agents = list()
+
+    @property
+    def results(self):
+        """
+        計測結果
+        {計測名: {'value': 値, 'unit': 単位, 'higher_is_better': 値が大きいほど良いか}}
+        """
+        return self.__results
+
+    def run(self):
+        """
+        すべての計測を実施
+        エージェントが学習データをカレントディレクトリに保存するため,一時ディレクトリで実施する
+        :return: 計測結果
+        """
+        directory = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory_work:
+            self.__directory_work = directory_work
+            os.chdir(directory_work)
+            try:
+                for size in self.__sizes:
+                    environment = MazeGenerator(self.__seed).create(size, size, braid=0.1)
+                    self.__measure_maze(environment, size)
+                    self.__measure_play(environment, size)
+                    self.__measure_fit(environment, size)
+                    self.__measure_dynamic_programing(environment, size)
+            finally:
+                os.chdir(directory)
+
+        return self.__results
+
+    def save(self, path):
+        """
+        計測結果をJSONファイルに保存
+        :param path: 保存先のパス
+        :return: なし
+        """
+        data = {'meta': {'time': datetime.now().isoformat(),
+                         'python': platform.python_version(),
+                         'numpy': np.__version__,
+                         'machine': platform.machine(),
+                         'sizes': list(self.__sizes),
+                         'repeat': self.__repeat},
+                'results': self.__results}
+        with open(path, 'w') as file:
+            json.dump(data, file, indent=2, sort_keys=True)
+
+    def __add(self, name, value, unit, higher_is_better):
+        """
+        計測結果を追加
+        :param name: 計測名
+        :param value: 値
+        :param unit: 単位
+        :param higher_is_better: 値が大きいほど良いか
+        :return: なし
+        """
+        self.__results[name] = {'value': float(value), 'unit': unit, 'higher_is_better': higher_is_better}
+        print('{0:<48} {1:>14.3f} {2}'.format(name, value, unit))
+
+    def __clear(self):
+        """
+        エージェントが保存した学習データを削除
+        以前の計測で保存したテーブルや重みを読み込まないようにする
+        削除中にバックグラウンドで書き込まないよう,作成済みのエージェントの保存待ちの書き込みを待機してから削除する
+        :return: なし
+        """
+        for agent in self.__agents:
+            agent.flush()
+        self.__agents = list()
+        for name in os.listdir(self.__directory_work):
+            path = os.path.join(self.__directory_work, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+    def __create_agent(self, create):
+        """
+        学習データを削除してからエージェントを生成
+        :param create: エージェントを生成する処理
+        :return: エージェント
+        """
+        self.__clear()
+        agent = create()
+        self.__agents.append(agent)
+
+        return agent
+
+    def __time(self, function, setup=None):
+        """
+        処理時間を計測
+        :param function: 計測する処理(setupを指定した場合はsetupの戻り値を引数とする)
+        :param setup: 繰り返しごとに計測の前に呼び出す処理(処理時間に含めない)
+        :return: 繰り返し回数分の処理時間の最小値(秒)
+        """
+        times = list()
+        for i in range(self.__repeat):
+            np.random.seed(self.__seed + i)
+            args = () if setup is None else (setup(), )
+            time_start = time.perf_counter()
+            function(*args)
+            times.append(time.perf_counter() - time_start)
+
+        return min(times)
+
+    def __measure_maze(self, environment, size, count=20000):
+        """
+        迷路の行動(set_action)と有効行動の取得(get_actions_effective)の処理速度を計測
+        :param environment: 環境
+        :param size: 迷路のサイズ
+        :param count: ステップ数
+        :return: なし
+        """
+        actions = np.random.RandomState(self.__seed).randint(0, 4, count).tolist()
+
+        def step():
+            environment.start()
+            for action in actions:
+                environment.set_action(action)
+                environment.get_actions_effective()
+
+        self.__add('maze_step/size={0}'.format(size), count / self.__time(step), 'steps/s', True)
+
+    def __measure_play(self, environment, size, count=3, step_max=2000):
+        """
+        エージェントごとのControl.playの処理速度を計測
+        :param environment: 環境
+        :param size: 迷路のサイズ
+        :param count: プレイ回数
+        :param step_max: 最大ステップ数
+        :return: なし
+        """
+        from agent_random import AgentRandom
+        from agent_monte_carlo import AgentMonteCarlo
+        from agent_td import AgentTD
+
+        agents = {'random': lambda: AgentRandom(),
+                  'monte_carlo': lambda: AgentMonteCarlo(size=(size, size), count_random_policy=count),
+                  'td_q': lambda: AgentTD(environment, mode_sarsa=False),
+                  'td_sarsa': lambda: AgentTD(environment, mode_sarsa=True)}
+        for name, create in agents.items():
+            # 学習が進むとエピソードの長さが変わるため,繰り返しごとにエージェントを生成し直す
+            elapsed = self.__time(lambda control: control.play(count, is_indicate=False, step_max=step_max),
+                                  lambda: Control(environment, [self.__create_agent(create)], is_display=False))
+            self.__add('play/{0}/size={1}'.format(name, size), count / elapsed, 'episodes/s', True)
+        self.__clear()
+
+    def __measure_fit(self, environment, size, step_max=2000):
+        """
+        エージェントごとの学習(fit)の処理時間を計測
+        :param environment: 環境
+        :param size: 迷路のサイズ
+        :param step_max: 学習データを作成するプレイの最大ステップ数
+        :return: なし
+        """
+        from agent_random import AgentRandom
+        from agent_monte_carlo import AgentMonteCarlo
+        from agent_td import AgentTD
+
+        # 学習データはランダム方策のプレイで作成
+        experience = Control(environment, [AgentRandom()], is_display=False).play(1, is_indicate=False,
+                                                                                   step_max=step_max)
+        modes = [True, False] if self.__mode_network else [True]
+        for mode_table in modes:
+            agents = {'monte_carlo': lambda: AgentMonteCarlo(size=(size, size), mode_table=mode_table,
+                                                             environment=environment),
+                      'td_q': lambda: AgentTD(environment, mode_sarsa=False, mode_table=mode_table)}
+            for name, create in agents.items():
+                agent = self.__create_agent(create)
+                elapsed = self.__time(lambda: agent.fit(experience, epochs=1))
+                self.__add('fit/{0}/{1}/size={2}'.format(name, 'table' if mode_table else 'network', size),
+                           elapsed, 's', False)
+            self.__clear()
+
+    def __measure_dynamic_programing(self, environment, size):
+        """
+        動的計画法の解法ごとの処理時間を計測
+        :param environment: 環境
+        :param size: 迷路のサイズ
+        :return: なし
+        """
+        from agent_dynamic_programing import AgentDynamicPrograming
+
+        solvers = ['vector', 'prioritized']
+        if size <= 16:
+            # 状態ごとの逐次更新は小さい迷路のみ計測
+            solvers.append('sweep')
+        for solver in solvers:
+            # 学習(fit)の処理時間のみ計測する(エージェントの生成と学習データの削除は含めない)
+            elapsed = self.__time(lambda agent: agent.fit(None, epochs=100000),
+                                  lambda: self.__create_agent(lambda: AgentDynamicPrograming(environment,
+                                                                                             mode_solver=solver)))
+            self.__add('dynamic_programing/{0}/size={1}'.format(solver, size), elapsed, 's', False)
+        self.__clear()
+
+
+def compare(path_baseline, path_current, threshold):
+    """
+    ベースラインの計測結果と比較して性能の劣化を検出
+    :param path_baseline: ベースラインの計測結果のパス
+    :param path_current: 比較する計測結果のパス
+    :param threshold: 劣化と判定する変化率
+    :return: 劣化した計測名のリスト
+    """
+    with open(path_baseline) as file:
+        baseline = json.load(file)['results']
+    with open(path_current) as file:
+        current = json.load(file)['results']
+
+    regressions = list()
+    for name in sorted(set(baseline) & set(current)):
+        value_baseline = baseline[name]['value']
+        value_current = current[name]['value']
+        if value_baseline == 0:
+            continue
+        ratio = value_current / value_baseline
+        if current[name]['higher_is_better']:
+            is_regression = ratio < 1 - threshold
+        else:
+            is_regression = 1 + threshold < ratio
+        if is_regression:
+            regressions.append(name)
+        print('{0:<48} {1:>14.3f} {2:>14.3f} {3:>7.2f} {4}'.format(name, value_baseline, value_current, ratio,
+                                                                  'REGRESSION' if is_regression else ''))
+
+    for name in sorted(set(baseline) - set(current)):
+        print('{0:<48} (計測結果なし)'.format(name))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='迷路と各エージェントの処理速度を計測する')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parser_run = subparsers.add_parser('run', help='計測を実施してJSONファイルに保存する')
+    parser_run.add_argument('--output', default='benchmark.json', help='保存先のパス')
+    parser_run.add_argument('--sizes', type=int, nargs='+', default=[8, 32, 128], help='迷路のサイズ')
+    parser_run.add_argument('--repeat', type=int, default=3, help='繰り返し回数')
+    parser_run.add_argument('--seed', type=int, default=0, help='乱数のシード')
+    parser_run.add_argument('--network', action='store_true', help='ニューラルネットワークモードの学習も計測する')
+
+    parser_compare = subparsers.add_parser('compare', help='ベースラインと比較して性能の劣化を検出する')
+    parser_compare.add_argument('baseline', help='ベースラインの計測結果のパス')
+    parser_compare.add_argument('current', help='比較する計測結果のパス')
+    parser_compare.add_argument('--threshold', type=float, default=0.2, help='劣化と判定する変化率')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        path = os.path.abspath(args.output)
+        benchmark = Benchmark(sizes=args.sizes, repeat=args.repeat, seed=args.seed, mode_network=args.network)
+        benchmark.run()
+        benchmark.save(path)
+        return 0
+
+    regressions = compare(args.baseline, args.current, args.threshold)
+    if regressions:
+        print('性能の劣化を検出しました:{0}件'.format(len(regressions)))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
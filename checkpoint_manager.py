@@ -0,0 +1,265 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class CheckpointManager:
+    def __init__(self, directory, interval=1, is_background=True):
+        """
+        コンストラクタ
+        学習データ(テーブルやニューラルネットワークの重み)をファイルに保存する
+        保存は一時ファイルに書き込んでから置き換えるため,書き込み中に中断しても以前のファイルは壊れない
+        バックグラウンドで保存する場合,保存待ちのデータは最新のものだけを保持する(書き込みが追いつかない場合は古いデータを破棄する)
+        保存先のディレクトリは作成時のカレントディレクトリを基準に絶対パスに変換する
+        テーブルの保持方法(メモリまたはメモリマップ,型)は差し替え可能なストレージの層としては設けず,
+        load_tableの引数(dtype,mode_memmap)で選択する(エージェントは読み込んだNumPyの配列をそのまま参照する)
+        バックグラウンドで保存する場合もメモリマップでないテーブルは呼び出し元のスレッドで複製するため,
+        保存のたびにテーブルのサイズに比例して学習が止まる(大きなテーブルはメモリマップで保持すること)
+        :param directory: 保存先のディレクトリ
+        :param interval: 保存間隔(saveの呼び出し回数,0以下の場合はforceを指定した場合のみ保存)
+        :param is_background: バックグラウンドのスレッドで保存するかのフラグ
+        """
+        self.__directory = os.path.abspath(directory)
+        self.__interval = interval
+        self.__is_background = is_background
+        self.__count = 0
+        self.__lock = threading.Lock()
+        self.__executor = None
+        self.__future = None
+        # 保存待ちのデータ(ファイル名: データ)
+        self.__pending = None
+        self.__is_writing = False
+        os.makedirs(self.__directory, exist_ok=True)
+
+    def __getstate__(self):
+        """
+        シリアライズする状態を取得
+        並列プレイのワーカーに複製を渡すため,スレッドと保存待ちのデータは除外する
+        :return: 状態
+        """
+        return {'directory': self.__directory, 'interval': self.__interval, 'is_background': self.__is_background}
+
+    def __setstate__(self, state):
+        self.__init__(state['directory'], state['interval'], state['is_background'])
+
+    @property
+    def directory(self):
+        """保存先のディレクトリ"""
+        return self.__directory
+
+    def get_path(self, name):
+        """
+        ファイルのパスを取得
+        :param name: ファイル名
+        :return: パス
+        """
+        return os.path.join(self.__directory, name)
+
+    def load(self, name):
+        """
+        ファイルから読み込み
+        :param name: ファイル名(拡張子が.npzの場合は配列のリストとして読み込む)
+        :return: 配列(拡張子が.npzの場合は配列のリスト)
+        """
+        path = self.get_path(name)
+        if name.endswith('.npz'):
+            with np.load(path) as data:
+                return [data['arr_{0}'.format(i)] for i in range(len(data.files))]
+
+        return np.load(path)
+
+    def load_weights(self, model, name):
+        """
+        ニューラルネットワークの重みをファイルから読み込んでモデルに設定
+        ファイルがない場合は以前のバージョンで保存した拡張子が.hdf5のファイル(Kerasのsave_weightsの形式)から読み込む
+        :param model: モデル(.hdf5のファイルから読み込む場合はload_weightsを持つKerasのモデルのみ)
+        :param name: ファイル名(.npz)
+        :return: なし
+        """
+        path = self.get_path(name)
+        path_legacy = os.path.splitext(path)[0] + '.hdf5'
+        if (not os.path.exists(path)) and os.path.exists(path_legacy) and hasattr(model, 'load_weights'):
+            # 以前のバージョンで保存したファイルのみがある場合
+            model.load_weights(path_legacy)
+            return
+
+        model.set_weights(self.load(name))
+
+    def load_table(self, name, shape, dtype=np.float64, fill=0.0, mode_memmap=False):
+        """
+        テーブルをファイルから読み込み
+        ファイルがない場合や形状が異なる場合はfillの値で作成する
+        メモリマップの場合はファイルを直接参照するため,読み込み時間とメモリ使用量がテーブルのサイズによらない
+        (テーブルの更新はファイルに直接反映され,保存時は一時ファイルを経由せずに書き出しのみ行う)
+        :param name: ファイル名(.npy)
+        :param shape: テーブルの形状
+        :param dtype: テーブルの型(np.float64,np.float32,np.float16など)
+        :param fill: 作成する場合の初期値
+        :param mode_memmap: メモリマップ選択フラグ(True:ファイルをメモリマップで参照,False:メモリに読み込み)
+        :return: テーブル
+        """
+        path = self.get_path(name)
+        shape = tuple(int(n) for n in shape)
+        dtype = np.dtype(dtype)
+        try:
+            # ヘッダーのみ読み込んで形状を確認
+            table = np.load(path, mmap_mode='r')
+            if table.shape != shape:
+                table = None
+        except (OSError, ValueError):
+            # ファイルがない場合
+            table = None
+
+        if not mode_memmap:
+            # メモリに読み込む場合
+            if table is None:
+                return np.full(shape, fill, dtype=dtype)
+            return np.array(table, dtype=dtype)
+
+        if (table is None) or (table.dtype != dtype):
+            # ファイルがないか型が異なる場合は一時ファイルに作成してから置き換え
+            path_temporary = path + '.tmp'
+            created = np.lib.format.open_memmap(path_temporary, mode='w+', dtype=dtype, shape=shape)
+            created[...] = fill if table is None else table
+            created.flush()
+            del created, table
+            os.replace(path_temporary, path)
+
+        return np.lib.format.open_memmap(path, mode='r+')
+
+    @staticmethod
+    def get_state_table(table):
+        """
+        テーブルのシリアライズする状態を取得
+        並列プレイのワーカーに複製を渡す際,メモリマップのテーブルはファイル名のみを渡す(配列を複製しない)
+        :param table: テーブル
+        :return: 状態(メモリマップの場合はファイル名)
+        """
+        if isinstance(table, np.memmap) and (table.filename is not None):
+            return table.filename
+
+        return table
+
+    @staticmethod
+    def set_state_table(state):
+        """
+        シリアライズした状態からテーブルを復元
+        メモリマップのテーブルはコピーオンライトで開く(ワーカーでの更新はファイルに反映しない)
+        :param state: 状態(get_state_tableの戻り値)
+        :return: テーブル
+        """
+        if isinstance(state, str):
+            return np.load(state, mmap_mode='c')
+
+        return state
+
+    def save(self, get_data, force=False):
+        """
+        保存間隔に達した場合に保存
+        データはこの時点の複製を保存するため,呼び出し後に元の配列を更新してもよい
+        バックグラウンドで保存する場合もこの複製は呼び出し元のスレッドで行うため,データのサイズに比例して呼び出し元を待たせる
+        (メモリマップの配列は複製せず,書き出しのみバックグラウンドで行う.大きなテーブルはメモリマップで保持すること)
+        :param get_data: 保存するデータ(ファイル名: 配列,拡張子が.npzの場合は配列のリスト)を返す関数
+                         (保存する場合のみ呼び出す)
+        :param force: 保存間隔にかかわらず保存するかのフラグ
+        :return: 保存したか(バックグラウンドの場合は保存を予約したか)
+        """
+        if not force:
+            self.__count += 1
+            if (self.__interval <= 0) or (self.__count % self.__interval != 0):
+                # 保存間隔に達していない場合
+                return False
+
+        # 学習中の更新の影響を受けないように複製(メモリマップはファイルに直接反映されるため複製しない)
+        snapshot = dict()
+        for name, value in get_data().items():
+            if isinstance(value, list):
+                snapshot[name] = [np.array(array) for array in value]
+            elif isinstance(value, np.memmap):
+                snapshot[name] = value
+            else:
+                snapshot[name] = np.array(value)
+        if not self.__is_background:
+            # バックグラウンドで保存しない場合
+            self.__write(snapshot)
+            return True
+
+        with self.__lock:
+            if self.__pending is None:
+                self.__pending = snapshot
+            else:
+                # 保存待ちのデータがある場合は新しいデータで上書き
+                self.__pending.update(snapshot)
+            if not self.__is_writing:
+                # 書き込み中でない場合は書き込みを開始
+                self.__is_writing = True
+                if self.__executor is None:
+                    self.__executor = ThreadPoolExecutor(1)
+                self.__future = self.__executor.submit(self.__write_pending)
+
+        return True
+
+    def flush(self):
+        """
+        保存待ちのデータの書き込み終了を待機
+        :return: なし
+        """
+        future = self.__future
+        if future is not None:
+            # 書き込みでの例外はここで送出する
+            future.result()
+
+    def close(self):
+        """
+        保存待ちのデータを書き込んでスレッドを終了
+        :return: なし
+        """
+        self.flush()
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+    def __write_pending(self):
+        """
+        保存待ちのデータがなくなるまで書き込み(バックグラウンドのスレッドで実行)
+        :return: なし
+        """
+        while True:
+            with self.__lock:
+                snapshot = self.__pending
+                self.__pending = None
+                if snapshot is None:
+                    self.__is_writing = False
+                    return
+            try:
+                self.__write(snapshot)
+            except BaseException:
+                with self.__lock:
+                    self.__is_writing = False
+                raise
+
+    def __write(self, snapshot):
+        """
+        一時ファイルに書き込んでから置き換え
+        メモリマップの配列は書き出しのみ行う
+        :param snapshot: 保存するデータ(ファイル名: 配列,拡張子が.npzの場合は配列のリスト)
+        :return: なし
+        """
+        for name, value in snapshot.items():
+            if isinstance(value, np.memmap):
+                # メモリマップの場合はファイルに書き出す
+                value.flush()
+                continue
+
+            path = self.get_path(name)
+            path_temporary = path + '.tmp'
+            with open(path_temporary, 'wb') as file:
+                if isinstance(value, list):
+                    np.savez(file, *value)
+                else:
+                    np.save(file, value)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(path_temporary, path)
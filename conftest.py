@@ -0,0 +1 @@
+# テストからリポジトリ直下のモジュールを読み込めるようにするためのファイル(pytestがこのディレクトリをsys.pathに追加する)
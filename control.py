@@ -1,13 +1,52 @@
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+import os
+
+import numpy as np
+
+from experience_buffer import ExperienceBuffer
+from play_stats import PlayStats
+
+
+def play_worker(environment, players, count, step_max, seed, mode_status_id=False):
+    """
+    並列プレイのワーカー処理
+    ワーカープロセスで受け取った環境とエージェントの複製を使用してプレイを実施する
+    :param environment: 環境の複製
+    :param players: エージェントの複製のリスト
+    :param count: プレイ回数
+    :param step_max: 最大ステップ数
+    :param seed: 乱数のシード
+    :param mode_status_id: エージェントに状態を状態IDで渡すかのフラグ
+    :return: プレイを実施しての経験(各プレイヤーのExperienceBufferのリスト)
+    """
+    np.random.seed(seed)
+    control = Control(environment, players, is_display=False, mode_status_id=mode_status_id)
+
+    return control.play(count, is_indicate=False, step_max=step_max)
 
 
 class Control:
-    def __init__(self, environment, players, is_display=True):
+    def __init__(self, environment, players, is_display=True, is_stats=False, mode_status_id=False):
         self.__environment = environment
+        # エージェントに状態を状態ID(y座標 * 幅 + x座標)で渡すか(経験には位置(x座標, y座標)で記録する)
+        self.__mode_status_id = mode_status_id
         self.__players = players
         self.__is_display = is_display
         self.__time_start = datetime.now()
         self.__time_elapsed = timedelta()
+        self.__executor = None
+        self.__count_worker = 0
+        # 処理ごとの処理時間の集計(集計しない場合はNone)
+        self.__stats = PlayStats() if is_stats else None
+
+    @property
+    def stats(self):
+        """
+        処理ごとの呼び出し回数と処理時間の集計
+        :return: 集計(PlayStats,集計しない場合はNone)
+        """
+        return self.__stats
 
     @property
     def time_elapsed(self):
@@ -15,7 +54,7 @@ class Control:
         経過時間
         :return: 経過時間
         """
-        if self.environment.is_play:
+        if self.__environment.is_play:
             # プレイ中の場合
             # 経過時間を更新
             self.__time_elapsed = datetime.now() - self.__time_start
@@ -28,15 +67,26 @@ class Control:
         :param count: プレイ回数
         :param is_indicate: 表示フラグ
         :param step_max: 最大ステップ数
-        :return: プレイを実施しての経験
+        :return: プレイを実施しての経験(各プレイヤーのExperienceBufferのリスト)
         """
 
         step = step_max
+        stats = self.__stats
+        mode_status_id = self.__mode_status_id
+        environment = self.__environment
+        # 処理時間を集計する場合のみ計測する処理で包む(ループの外で1回だけ作成し,集計しない場合は元の処理を直接呼び出す)
+        wrap = stats.wrap if stats is not None else (lambda phase, function: function)
+        get_actions_effective = wrap('get_actions_effective', environment.get_actions_effective)
+        set_action = wrap('set_action', environment.set_action)
+        append = wrap('append', ExperienceBuffer.append)
+        get_action = [wrap('get_action', player.get_action) for player in self.__players]
+        get_reward = [wrap('get_reward', player.get_reward) for player in self.__players]
+        get_q = [wrap('get_q', player.get_q) for player in self.__players]
 
-        # 経験(1階層：各プレイヤーのリスト、2階層：各プレイ情報のリスト、3階層：属性のディクショナリ、4階層：データの値)
+        # 経験(各プレイヤーのExperienceBuffer、プレイのインデックスで各プレイの経験を参照する)
         experience = list()
         for j in range(len(self.__players)):
-            experience.append(list())
+            experience.append(ExperienceBuffer())
 
         for i in range(count):
             if is_indicate:
@@ -46,15 +96,7 @@ class Control:
             self.__environment.start()
             for j in range(len(self.__players)):
                 self.__players[j].initialize()
-                experience[j].append(dict())
-                experience[j][-1]['status'] = list()
-                experience[j][-1]['actions_effective'] = list()
-                experience[j][-1]['action'] = list()
-                experience[j][-1]['status_next'] = list()
-                experience[j][-1]['action_next'] = list()
-                experience[j][-1]['actions_effective_next'] = list()
-                experience[j][-1]['reward'] = list()
-                experience[j][-1]['q'] = list()
+                experience[j].start_episode()
 
             if self.__is_display:
                 # 表示する場合
@@ -70,44 +112,50 @@ class Control:
                     while True:
                         counter += 1
                         # 行動前の状態を取得
-                        status = self.__environment.status
+                        status = environment.status_id if mode_status_id else environment.status
                         # 行動前の有効な行動リストを取得
-                        actions_effective = self.__environment.get_actions_effective()
+                        actions_effective = get_actions_effective()
                         # 行動を取得
                         if is_first[j] or not self.__players[j].mode_sarsa:
                             # 初回取得またはSARSAモードでない場合
-                            action = self.__players[j].get_action(self.__environment.status, actions_effective)
+                            action = get_action[j](status, actions_effective)
                         else:
                             # SARSAモードの場合
-                            action = self.__players[j].get_action(self.__environment.status, actions_effective, is_previous=False)
+                            action = get_action[j](status, actions_effective, is_previous=False)
                         is_first[j] = False
                         # 行動を実施
-                        can_action = self.__environment.set_action(action)
+                        can_action = set_action(action)
+                        # 行動後の状態を取得
+                        status_next = environment.status_id if mode_status_id else environment.status
                         # 行動後の有効な行動リストを取得
-                        actions_effective_next = self.__environment.get_actions_effective()
+                        actions_effective_next = get_actions_effective()
                         # 環境からの情報を通知
-                        reward = self.__players[j].get_reward(status,
-                                                              action,
-                                                              can_action,
-                                                              self.__environment.status,
-                                                              self.__environment.is_play,
-                                                              self.__environment.score,
-                                                              actions_effective_next)
+                        reward = get_reward[j](status,
+                                               action,
+                                               can_action,
+                                               status_next,
+                                               environment.is_play,
+                                               environment.score,
+                                               actions_effective_next)
                         action_next = None
                         if self.__players[j].mode_sarsa:
                             # SARSAモードの場合
                             # 次回の行動を取得する
-                            action_next = self.__players[j].get_action(self.__environment.status, actions_effective)
-                        q = self.__players[i].get_q(status, action, self.__environment.status, action_next, reward)
-
-                        experience[j][-1]['status'].append(status)
-                        experience[j][-1]['actions_effective'].append(actions_effective)
-                        experience[j][-1]['action'].append(action)
-                        experience[j][-1]['status_next'].append(self.__environment.status)
-                        experience[j][-1]['action_next'].append(action_next)
-                        experience[j][-1]['actions_effective_next'].append(actions_effective_next)
-                        experience[j][-1]['reward'].append(reward)
-                        experience[j][-1]['q'].append(q)
+                            action_next = get_action[j](status_next, actions_effective)
+                        q = get_q[j](status, action, status_next, action_next, reward)
+
+                        if mode_status_id:
+                            # 状態IDの場合は経験には位置で記録
+                            append(experience[j], environment.get_status(status), actions_effective, action,
+                                   environment.get_status(status_next), action_next,
+                                   actions_effective_next, reward, q, not environment.is_play)
+                        else:
+                            append(experience[j], status, actions_effective, action, status_next, action_next,
+                                   actions_effective_next, reward, q, not environment.is_play)
+
+                        if stats is not None:
+                            # 集計する場合
+                            stats.add_count_step(can_action)
 
                         if is_indicate and (counter % 100 == 0):
                             print('　　　play count:{0}回目'.format(counter))
@@ -118,8 +166,8 @@ class Control:
 
                     if self.__is_display:
                         # 表示する場合
-                        # 初期状態を表示
-                        self.__environment.display()
+                        # 行動後の状態を表示(最大表示回数を超える場合は省略,ゴールした場合は必ず表示)
+                        self.__environment.display(is_force=not self.__environment.is_play)
 
                     if not self.__environment.is_play:
                         # プレイが終了していた場合
@@ -143,6 +191,81 @@ class Control:
 
             # 終了処理を実施
             for j in range(len(self.__players)):
-                self.__players[j].finalize(self.__environment.status, self.__environment.score)
+                self.__players[j].finalize(self.__environment.status_id if mode_status_id else self.__environment.status,
+                                           self.__environment.score)
+
+            if stats is not None:
+                # 集計する場合
+                stats.add_episode()
+
+        return experience
+
+    def play_parallel(self, count=1, count_worker=None, step_max=0):
+        """
+        複数のワーカープロセスで並列にプレイを実施
+        各ワーカーには環境とエージェントの複製を渡すため,プレイ中のエージェントの学習(get_qでの更新など)は反映されない
+        (get_qで学習するエージェント(is_learning_in_get_q)の場合は学習しないまま終わるためValueErrorを送出する)
+        ワーカー数が前回の呼び出しと異なる場合はワーカープロセスを作り直す
+        ニューラルネットワークモードのエージェントは行動価値Qテーブルの複製で行動を選択する
+        ゴールしたプレイは最後のステップの報酬取得処理をエージェントに通知する(ランダム方策の実施回数などを更新するため)
+        :param count: プレイ回数
+        :param count_worker: ワーカー数(Noneの場合はCPU数)
+        :param step_max: 最大ステップ数
+        :return: プレイを実施しての経験(各プレイヤーのExperienceBufferのリスト)
+        """
+        for player in self.__players:
+            if player.is_learning_in_get_q:
+                raise ValueError('プレイ中に学習するエージェントは並列プレイできません:{0}'.format(type(player).__name__))
+
+        if count_worker is None:
+            count_worker = os.cpu_count()
+        count_worker = max(1, min(count_worker, count))
+        if (self.__executor is not None) and (self.__count_worker != count_worker):
+            # ワーカー数が変わった場合は作り直す
+            self.close()
+        if self.__executor is None:
+            # ワーカープロセスが未起動の場合
+            self.__executor = ProcessPoolExecutor(count_worker)
+            self.__count_worker = count_worker
+
+        # プレイ回数をワーカーに分配
+        counts = [count // count_worker + (1 if i < count % count_worker else 0) for i in range(count_worker)]
+        seeds = np.random.randint(0, 2 ** 31, count_worker)
+        futures = [self.__executor.submit(play_worker, self.__environment, self.__players, counts[i], step_max,
+                                          seeds[i], self.__mode_status_id)
+                   for i in range(count_worker) if 0 < counts[i]]
+
+        # 各ワーカーの経験を結合
+        experience = [ExperienceBuffer() for j in range(len(self.__players))]
+        for future in futures:
+            for j, buffer in enumerate(future.result()):
+                experience[j].extend(buffer)
+
+        for j in range(len(self.__players)):
+            for episode in experience[j]:
+                if (0 < len(episode)) and episode['is_done'][-1]:
+                    # ゴールしたプレイの場合
+                    status = episode['status'][-1]
+                    status_next = episode['status_next'][-1]
+                    if self.__mode_status_id:
+                        # 状態IDの場合は経験の位置を変換
+                        status = self.__environment.get_status_id(status)
+                        status_next = self.__environment.get_status_id(status_next)
+                    self.__players[j].get_reward(status,
+                                                 episode['action'][-1],
+                                                 True,
+                                                 status_next,
+                                                 False,
+                                                 self.__environment.score,
+                                                 np.flatnonzero(episode['actions_effective_next'][-1]).tolist())
 
         return experience
+
+    def close(self):
+        """
+        並列プレイのワーカープロセスを終了
+        :return: なし
+        """
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
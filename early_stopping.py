@@ -0,0 +1,66 @@
+import numpy as np
+
+
+class EarlyStopping:
+    def __init__(self, count_policy_stable=0, count_plateau=0, tolerance_plateau=0.0):
+        """
+        コンストラクタ
+        学習の収束を判定する
+        貪欲方策(各状態で価値が最大の行動)が指定回数連続で変化しない場合,
+        またはゴールまでの手数の直近の平均が指定回数連続で改善しない場合に収束したと判定する
+        :param count_policy_stable: 方策が変化しない連続回数(0以下の場合は判定しない)
+        :param count_plateau: 手数の平均が改善しない連続回数(0以下の場合は判定しない)
+        :param tolerance_plateau: 改善とみなす手数の平均の最小の減少量
+        """
+        self.__count_policy_stable = count_policy_stable
+        self.__count_plateau = count_plateau
+        self.__tolerance_plateau = tolerance_plateau
+        self.__policy = None
+        self.__count_stable = 0
+        self.__best = None
+        self.__count_not_improved = 0
+
+    @property
+    def is_policy_required(self):
+        """方策の変化を判定するか(方策を算出する必要があるか)"""
+        return 0 < self.__count_policy_stable
+
+    @property
+    def count_stable(self):
+        """方策が変化していない連続回数"""
+        return self.__count_stable
+
+    @property
+    def count_not_improved(self):
+        """手数の平均が改善していない連続回数"""
+        return self.__count_not_improved
+
+    def update(self, policy=None, value=None):
+        """
+        1ループの結果で収束を判定
+        :param policy: 貪欲方策(状態ごとの行動の配列,Noneの場合は方策の変化を判定しない)
+        :param value: ゴールまでの手数の直近の平均(Noneの場合は改善を判定しない)
+        :return: 収束した理由('policy_stable':方策が変化しない,'plateau':手数が改善しない,収束していない場合はNone)
+        """
+        if self.is_policy_required and (policy is not None):
+            # 方策の変化を判定する場合
+            if (self.__policy is not None) and np.array_equal(policy, self.__policy):
+                self.__count_stable += 1
+            else:
+                self.__count_stable = 0
+            self.__policy = policy
+            if self.__count_policy_stable <= self.__count_stable:
+                return 'policy_stable'
+
+        if (0 < self.__count_plateau) and (value is not None):
+            # 手数の改善を判定する場合
+            if (self.__best is None) or (value < self.__best - self.__tolerance_plateau):
+                # 改善した場合
+                self.__best = value
+                self.__count_not_improved = 0
+            else:
+                self.__count_not_improved += 1
+            if self.__count_plateau <= self.__count_not_improved:
+                return 'plateau'
+
+        return None
@@ -0,0 +1,222 @@
+import numpy as np
+
+
+class ExperienceBuffer:
+    # 属性ごとの(列の形状, 型)
+    COLUMNS = {'status': ((2, ), np.int64),
+               'actions_effective': ((), np.uint8),
+               'action': ((), np.int64),
+               'status_next': ((2, ), np.int64),
+               'action_next': ((), np.int64),
+               'actions_effective_next': ((), np.uint8),
+               'reward': ((), np.float64),
+               'q': ((), np.float64),
+               'is_done': ((), bool)}
+    # 有効行動をビットマスクで保持する属性
+    COLUMNS_MASK = ('actions_effective', 'actions_effective_next')
+
+    def __init__(self, capacity=1024):
+        """
+        コンストラクタ
+        1人のプレイヤーの経験を属性ごとの配列で保持する
+        配列は容量が不足した時点で2倍に拡張する
+        :param capacity: 初期の容量(ステップ数)
+        """
+        self.__count = 0
+        self.__data = {key: np.zeros((capacity, ) + shape, dtype=dtype)
+                       for key, (shape, dtype) in self.COLUMNS.items()}
+        # 各プレイの開始位置
+        self.__offsets = list()
+
+    def __len__(self):
+        """プレイ数"""
+        return len(self.__offsets)
+
+    def __getitem__(self, index):
+        """
+        プレイの経験を取得
+        :param index: プレイのインデックス(負の値の場合は末尾から)
+        :return: プレイの経験(ExperienceEpisode)
+        """
+        index = range(len(self.__offsets))[index]
+        begin = self.__offsets[index]
+        end = self.__offsets[index + 1] if index + 1 < len(self.__offsets) else self.__count
+
+        return ExperienceEpisode(self, begin, end)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def count_step(self):
+        """全プレイのステップ数"""
+        return self.__count
+
+    @property
+    def offsets(self):
+        """各プレイの開始位置"""
+        return np.array(self.__offsets, dtype=np.int64)
+
+    def start_episode(self):
+        """
+        新しいプレイを開始
+        :return: なし
+        """
+        self.__offsets.append(self.__count)
+
+    def append(self, status, actions_effective, action, status_next, action_next, actions_effective_next,
+               reward, q, is_done):
+        """
+        1ステップの経験を追加
+        :param status: 行動前の状態
+        :param actions_effective: 行動前の有効行動リスト
+        :param action: 行動
+        :param status_next: 行動後の状態
+        :param action_next: 行動後の状態の行動(Noneの場合は-1として保持)
+        :param actions_effective_next: 行動後の有効行動リスト
+        :param reward: 報酬
+        :param q: 行動価値Q
+        :param is_done: プレイ終了フラグ
+        :return: なし
+        """
+        if self.__count == self.__data['action'].shape[0]:
+            # 容量が不足した場合は拡張
+            self.__expand(self.__count * 2)
+
+        i = self.__count
+        self.__data['status'][i] = status
+        self.__data['actions_effective'][i] = self.get_mask(actions_effective)
+        self.__data['action'][i] = action
+        self.__data['status_next'][i] = status_next
+        self.__data['action_next'][i] = -1 if action_next is None else action_next
+        self.__data['actions_effective_next'][i] = self.get_mask(actions_effective_next)
+        self.__data['reward'][i] = reward
+        self.__data['q'][i] = q
+        self.__data['is_done'][i] = is_done
+        self.__count += 1
+
+    def extend(self, other):
+        """
+        他の経験のすべてのプレイを末尾に追加
+        :param other: 追加する経験(ExperienceBuffer)
+        :return: なし
+        """
+        count = other.count_step
+        if self.__data['action'].shape[0] < self.__count + count:
+            # 容量が不足する場合は拡張
+            self.__expand(max(self.__count * 2, self.__count + count))
+
+        for key in self.COLUMNS:
+            self.__data[key][self.__count:self.__count + count] = other.get_raw(key)
+        self.__offsets.extend((other.offsets + self.__count).tolist())
+        self.__count += count
+
+    def get_raw(self, key):
+        """
+        属性の値を保持している形式のまま取得
+        :param key: 属性名
+        :return: 属性の値(ステップ数, ...)
+        """
+        return self.__data[key][:self.__count]
+
+    def get(self, key, begin=0, end=None):
+        """
+        属性の値を取得
+        有効行動の属性は行動ごとの有効性(True:有効,False:無効)に変換して返す
+        :param key: 属性名
+        :param begin: 開始位置
+        :param end: 終了位置(Noneの場合は末尾)
+        :return: 属性の値(ステップ数, ...)
+        """
+        if end is None:
+            end = self.__count
+        data = self.__data[key][begin:end]
+        if key in self.COLUMNS_MASK:
+            # 有効行動の場合
+            data = ((data[:, np.newaxis] >> np.arange(4, dtype=np.uint8)) & 1).astype(bool)
+
+        return data
+
+    @staticmethod
+    def get_return(reward, decay):
+        """
+        割引報酬和を算出
+        各ステップ以降の報酬を減衰率で割り引いた和(末尾から r + decay * 次のステップの値 を累積した値)を一括で算出する
+        減衰率のべき乗がアンダーフローしない長さのブロックごとに末尾から処理する
+        :param reward: 報酬(ステップ数)
+        :param decay: 減衰率
+        :return: 割引報酬和(ステップ数)
+        """
+        reward = np.asarray(reward, dtype=np.float64)
+        if 0 < decay < 1:
+            # 減衰率のべき乗が1e-100を下回らない長さ
+            size_block = int(min(1024, max(1, -230 / np.log(decay))))
+        else:
+            size_block = 1 if decay == 0 else 1024
+        power = decay ** np.arange(size_block + 1, dtype=np.float64)
+
+        value = np.empty(reward.shape[0])
+        carry = 0.0
+        for end in range(reward.shape[0], 0, -size_block):
+            begin = max(0, end - size_block)
+            count = end - begin
+            # ブロック内の割引報酬和に,ブロックより後の割引報酬和を割り引いて加算
+            total = np.cumsum((reward[begin:end] * power[:count])[::-1])[::-1]
+            value[begin:end] = total / power[:count] + power[count:0:-1] * carry
+            carry = value[begin]
+
+        return value
+
+    @staticmethod
+    def get_mask(actions_effective):
+        """
+        有効行動リストをビットマスクに変換
+        :param actions_effective: 有効行動リスト
+        :return: ビットマスク(行動nが有効な場合にnビット目が1)
+        """
+        mask = 0
+        for action in actions_effective:
+            mask |= 1 << action
+
+        return mask
+
+    def __expand(self, capacity):
+        """
+        配列の容量を拡張
+        :param capacity: 拡張後の容量
+        :return: なし
+        """
+        for key, data in self.__data.items():
+            expanded = np.zeros((capacity, ) + data.shape[1:], dtype=data.dtype)
+            expanded[:self.__count] = data[:self.__count]
+            self.__data[key] = expanded
+
+
+class ExperienceEpisode:
+    def __init__(self, buffer, begin, end):
+        """
+        コンストラクタ
+        ExperienceBufferの1プレイ分の範囲を参照する
+        :param buffer: 経験(ExperienceBuffer)
+        :param begin: 開始位置
+        :param end: 終了位置
+        """
+        self.__buffer = buffer
+        self.__begin = begin
+        self.__end = end
+
+    def __len__(self):
+        """ステップ数"""
+        return self.__end - self.__begin
+
+    def __getitem__(self, key):
+        """
+        属性の値を取得
+        :param key: 属性名
+        :return: 属性の値(ステップ数, ...)
+        """
+        return self.__buffer.get(key, self.__begin, self.__end)
+
+    def keys(self):
+        return ExperienceBuffer.COLUMNS.keys()
@@ -0,0 +1,462 @@
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from datetime import datetime
+
+import numpy as np
+
+from control import Control
+from early_stopping import EarlyStopping
+from metrics_log import MetricsLog
+from runner import Runner
+from maze import Maze
+from maze_generator import MazeGenerator
+
+# 実験設定の既定値
+DEFAULTS = {'name': None,
+            # モード('User','Random','monte_carlo','dynamic_programing','td_q','td_sarsa')
+            'mode': 'dynamic_programing',
+            # テーブルモード
+            'mode_table': False,
+            # プレイ回数
+            'count_play': 1,
+            # 最大ステップ数
+            'step_max': 0,
+            # 最大ループ数
+            'count_loop_max': 1,
+            # ループでの表示間隔
+            'step_indicate': 100,
+            # ゴールまでの手数の統計量を算出する直近のループ数
+            'size_window': 100,
+            # 貪欲方策がこのループ数連続で変化しない場合に終了する(0の場合は最大ループ数まで実施)
+            # 判定する場合はループごとに行動価値Qまたは価値Vのテーブル全体から方策を算出する
+            'count_policy_stable': 0,
+            # ゴールまでの手数の直近の平均がこのループ数連続で改善しない場合に終了する(0の場合は判定しない)
+            'count_plateau': 0,
+            # 改善とみなす手数の平均の最小の減少量
+            'tolerance_plateau': 0.0,
+            # エポック数
+            'epochs': 10000,
+            # ヘッドレスモード(表示なしで高速にプレイする)
+            'mode_headless': True,
+            # 処理時間の集計モード(ループごとにプレイの処理ごとの処理時間を表示する)
+            'mode_stats': False,
+            # 状態IDモード(エージェントに状態を位置の配列ではなく状態ID(y座標 * 幅 + x座標)で渡す)
+            'mode_status_id': True,
+            # 乱数のシード(Noneの場合は固定しない)
+            'seed': None,
+            # 迷路の生成設定(Noneの場合は既定の迷路,{'width', 'height', 'braid', 'seed'}を指定すると生成)
+            'maze': None,
+            # 学習後の行動価値Qまたは価値Vを表示するか
+            'display_result': True,
+            # 学習後の各マスの価値V(行動価値Qの場合は最大値)を迷路の1行を1行として出力ディレクトリのtable.csvに書き込むか
+            'dump_result': False,
+            # エージェントのコンストラクタに渡す引数(モードごとの既定値を上書き)
+            'agent': {}}
+
+# モードとテーブルモードの組み合わせごとの実験設定の既定値
+MODE_DEFAULTS = {('monte_carlo', True): {'count_play': 1, 'count_loop_max': 1000},
+                 ('dynamic_programing', True): {'count_play': 0, 'count_loop_max': 1000, 'epochs': 100000},
+                 ('dynamic_programing', False): {'count_play': 0, 'count_loop_max': 1000, 'epochs': 30000},
+                 ('td_q', True): {'count_play': 1, 'step_max': 100000, 'count_loop_max': 1000},
+                 ('td_q', False): {'count_play': 1, 'count_loop_max': 1000},
+                 ('td_sarsa', True): {'count_play': 1, 'step_max': 10000, 'count_loop_max': 1000},
+                 ('td_sarsa', False): {'count_play': 1, 'count_loop_max': 1000}}
+
+# モードとテーブルモードの組み合わせごとのエージェントの引数の既定値
+AGENT_DEFAULTS = {('monte_carlo', True): {'decay': 0.99, 'count_random_policy': 1},
+                  ('monte_carlo', False): {'decay': 0.99, 'count_random_policy': 1},
+                  ('dynamic_programing', True): {'mode_solver': 'vector'},
+                  ('td_q', True): {'count_random_policy': 10},
+                  ('td_q', False): {'count_random_policy': 10, 'capacity_replay': 10000, 'count_train_per_step': 0.25},
+                  ('td_sarsa', True): {'count_random_policy': 0},
+                  ('td_sarsa', False): {'count_random_policy': 10, 'interval_train': 32}}
+
+
+class Experiment:
+    def __init__(self, config, directory_output='output'):
+        """
+        コンストラクタ
+        指定プレイ回数のプレイと学習のセットを指定回数ループする実験を1回実施する
+        実験ごとの出力ディレクトリに設定,結果,学習データを保存する
+        :param config: 実験設定(指定がない項目はモードごとの既定値,DEFAULTSの順で補完する)
+        :param directory_output: 出力先のディレクトリ(この下に実験名のディレクトリを作成する)
+        """
+        self.__settings = self.get_settings(config)
+        if self.__settings['name'] is None:
+            # 実験名の指定がない場合はモードと時刻から作成
+            self.__settings['name'] = '{0}_{1}_{2}'.format(self.__settings['mode'],
+                                                           'table' if self.__settings['mode_table'] else 'network',
+                                                           datetime.now().strftime('%Y%m%d_%H%M%S_%f'))
+        self.__directory = os.path.join(directory_output, self.__settings['name'])
+
+    @property
+    def settings(self):
+        """補完後の実験設定"""
+        return self.__settings
+
+    @property
+    def directory(self):
+        """実験の出力ディレクトリ"""
+        return self.__directory
+
+    @staticmethod
+    def get_settings(config):
+        """
+        実験設定を補完
+        :param config: 実験設定
+        :return: 補完後の実験設定
+        """
+        unknown = set(config) - set(DEFAULTS)
+        if unknown:
+            raise ValueError('未知の設定項目です:{0}'.format(', '.join(sorted(unknown))))
+
+        mode = config.get('mode', DEFAULTS['mode'])
+        mode_table = config.get('mode_table', DEFAULTS['mode_table'])
+        settings = dict(DEFAULTS)
+        settings.update(MODE_DEFAULTS.get((mode, mode_table), {}))
+        settings.update(config)
+        settings['agent'] = dict(AGENT_DEFAULTS.get((mode, mode_table), {}), **config.get('agent', {}))
+
+        return settings
+
+    def run(self):
+        """
+        実験を実施
+        :return: 実験結果
+        """
+        settings = self.__settings
+        os.makedirs(self.__directory, exist_ok=True)
+        with open(os.path.join(self.__directory, 'config.json'), 'w') as file:
+            json.dump(settings, file, indent=2, ensure_ascii=False)
+
+        if settings['seed'] is not None:
+            np.random.seed(settings['seed'])
+
+        time_start = time.monotonic()
+        environment = self.__create_environment()
+        agent = self.__create_agent(environment)
+        count_play = settings['count_play']
+        step_max = settings['step_max']
+        count_loop_max = settings['count_loop_max']
+        step_indicate = settings['step_indicate']
+
+        # 制御インスタンスを生成
+        control = Control(environment, [agent], is_display=False, is_stats=settings['mode_stats'],
+                          mode_status_id=settings['mode_status_id'])
+        # ヘッドレスモードで使用する実行インスタンスを生成
+        runner = Runner(environment, [agent], is_stats=settings['mode_stats'], mode_status_id=settings['mode_status_id'])
+
+        # ループごとの記録はmetrics.jsonlに書き込み,ゴールまでの手数は直近の統計量と間引いた推移のみ保持する
+        metrics = MetricsLog(os.path.join(self.__directory, 'metrics.jsonl'), settings['size_window'])
+        window = metrics.window
+        early_stopping = EarlyStopping(settings['count_policy_stable'], settings['count_plateau'],
+                                       settings['tolerance_plateau'])
+        count_loop = 0
+        reason_stop = None
+        try:
+            # 指定プレイ回数のプレイと学習のセットを指定回数ループ
+            for i in range(count_loop_max):
+                experience = None
+                count_to_goal = None
+                if 0 < count_play:
+                    # プレイする場合
+                    # 指定回数のプレイを実施
+                    if settings['mode_headless']:
+                        # ヘッドレスモードの場合
+                        experience = runner.run(count_play, step_max=step_max)
+                        stats = runner.stats
+                    else:
+                        experience = control.play(count_play, is_indicate=True, step_max=step_max)
+                        stats = control.stats
+                    if stats is not None:
+                        # 処理時間の集計モードの場合
+                        # 今回のループの集計を表示
+                        print(stats)
+                        stats.reset()
+                    # ゴールまでの手数を記憶
+                    count_to_goal = environment.count
+
+                # 学習を実施
+                time_fit = time.perf_counter()
+                loss = agent.fit(experience, number=i, epochs=settings['epochs'])
+                time_fit = time.perf_counter() - time_fit
+                metrics.add(i, count_to_goal, time_fit, loss)
+                count_loop = i + 1
+
+                if (count_to_goal is not None) and (0 < i) \
+                        and ((i % step_indicate == 0) or (i == count_loop_max - 1)):
+                    # 表示のタイミングの場合
+                    print('プレイ回数：{0} 攻略手数：{1} 過去{2}回の平均：{3:.2f} 過去{2}回の最小攻略手数:{4}'.format(
+                        i + 1, count_to_goal, len(window), window.mean, window.min))
+                    if settings['mode_headless']:
+                        # ヘッドレスモードの場合
+                        print('ステップ数/秒：{0:.0f}'.format(runner.steps_per_second))
+                        runner.reset()
+
+                # 収束を判定(手数の平均は直近のループ数が揃ってから判定する)
+                policy = self.get_policy(environment, agent) if early_stopping.is_policy_required else None
+                value = window.mean if len(window) == settings['size_window'] else None
+                reason_stop = early_stopping.update(policy, value)
+                if reason_stop is not None:
+                    # 収束した場合
+                    print('ループ数：{0} で収束したため終了します({1})'.format(count_loop, reason_stop))
+                    break
+        finally:
+            metrics.close()
+
+        # 保存待ちの学習データを書き込み
+        agent.flush()
+
+        if settings['display_result']:
+            try:
+                # 学習後の行動価値Qの値を出力
+                environment.display(agent.get_q_table(environment.get_actions_effective))
+            except:
+                # 学習後の行動価値Qの値を出力
+                environment.display(agent.get_v_table(), is_q=False)
+
+        if settings['dump_result']:
+            path = os.path.join(self.__directory, 'table.csv')
+            try:
+                # 学習後の行動価値Qの値を書き込み
+                environment.renderer.dump_csv(path, agent.get_q_table(environment.get_actions_effective))
+            except:
+                # 学習後の価値Vの値を書き込み
+                environment.renderer.dump_csv(path, agent.get_v_table(), is_q=False)
+
+        result = {'name': settings['name'],
+                  'status': 'succeeded',
+                  'time_elapsed': time.monotonic() - time_start,
+                  'count_loop': count_loop,
+                  'reason_stop': reason_stop,
+                  'count_to_goal_last': window.last,
+                  'count_to_goal_mean': window.mean,
+                  'count_to_goal_min': window.min,
+                  'count_to_goal_p90': window.percentile(90),
+                  'count_to_goal': metrics.curve,
+                  'count_to_goal_interval': metrics.interval_curve,
+                  'path_metrics': os.path.abspath(metrics.path),
+                  'policy_length': self.get_policy_length(environment, agent)}
+        self.__save_result(result)
+
+        return result
+
+    def fail(self, error):
+        """
+        実験の失敗を記録
+        :param error: 発生した例外
+        :return: 実験結果
+        """
+        result = {'name': self.__settings['name'],
+                  'status': 'failed',
+                  'error': '{0}: {1}'.format(type(error).__name__, error)}
+        os.makedirs(self.__directory, exist_ok=True)
+        self.__save_result(result)
+
+        return result
+
+    @staticmethod
+    def get_policy(environment, agent):
+        """
+        学習後の貪欲方策を算出
+        各状態で有効な行動のうち行動価値Q(価値Vのエージェントは移動先の価値V)が最大の行動を選択する
+        :param environment: 環境
+        :param agent: エージェント
+        :return: 各状態の行動(y座標, x座標)(行動価値Qと価値Vのテーブルがいずれもない場合はNone)
+        """
+        status_next_table = environment.status_next_table
+        actions_effective_table = environment.actions_effective_table
+        q_data = agent.get_q_table(environment.get_actions_effective)
+        if q_data.shape != actions_effective_table.shape:
+            # 行動価値Qのテーブルがない場合は移動先の価値Vを行動価値Qとする
+            v_data = agent.get_v_table()
+            if v_data.shape != actions_effective_table.shape[:2]:
+                return None
+            q_data = v_data[status_next_table[:, :, :, 1], status_next_table[:, :, :, 0]]
+        # 無効な行動は選択しない
+        q_data = np.where(actions_effective_table, q_data, -np.inf)
+
+        return np.argmax(q_data, axis=2)
+
+    @staticmethod
+    def get_policy_length(environment, agent):
+        """
+        学習後の方策でのゴールまでの手数を算出
+        各状態で有効な行動のうち行動価値Q(価値Vのエージェントは移動先の価値V)が最大の行動を選択してスタートから移動する
+        :param environment: 環境
+        :param agent: エージェント
+        :return: ゴールまでの手数(ゴールできない場合はNone)
+        """
+        policy = Experiment.get_policy(environment, agent)
+        if policy is None:
+            return None
+
+        status_next_table = environment.status_next_table
+        status = environment.status_start
+        goal = environment.status_goal
+        visited = set()
+        count = 0
+        while (status != goal).any():
+            key = (int(status[0]), int(status[1]))
+            if key in visited:
+                # 同じ状態を繰り返す場合はゴールできない
+                return None
+            visited.add(key)
+            action = int(policy[status[1], status[0]])
+            status = status_next_table[status[1], status[0], action]
+            count += 1
+
+        return count
+
+    def __save_result(self, result):
+        """
+        実験結果をJSONファイルに保存
+        :param result: 実験結果
+        :return: なし
+        """
+        with open(os.path.join(self.__directory, 'result.json'), 'w') as file:
+            json.dump(result, file, indent=2, ensure_ascii=False)
+
+    def __create_environment(self):
+        """
+        環境を生成
+        :return: 環境
+        """
+        maze = self.__settings['maze']
+        if maze is None:
+            # 迷路の生成設定がない場合は既定の迷路
+            return Maze()
+
+        return MazeGenerator(maze.get('seed')).create(maze['width'], maze['height'], braid=maze.get('braid', 0.0))
+
+    def __create_agent(self, environment):
+        """
+        モードに合わせたエージェントを生成
+        :param environment: 環境
+        :return: エージェント
+        """
+        mode = self.__settings['mode']
+        mode_table = self.__settings['mode_table']
+        kwargs = dict(self.__settings['agent'])
+        directory = os.path.join(self.__directory, 'data')
+        if mode == 'User':
+            # ユーザーモードの場合
+            from agent_user import AgentUser
+            return AgentUser()
+        elif mode == 'Random':
+            # ランダムモードの場合
+            from agent_random import AgentRandom
+            return AgentRandom()
+        elif mode == 'monte_carlo':
+            # モンテカルロ法モードの場合
+            from agent_monte_carlo import AgentMonteCarlo
+            # 状態サイズを環境から取得するため環境を指定(ニューラルネットワークモードでは全状態の一括の推論にも使用)
+            kwargs.setdefault('environment', environment)
+            return AgentMonteCarlo(mode_table=mode_table, directory=directory, **kwargs)
+        elif mode == 'dynamic_programing':
+            # 動的計画法モードの場合
+            from agent_dynamic_programing import AgentDynamicPrograming
+            return AgentDynamicPrograming(environment=environment, mode_table=mode_table, directory=directory, **kwargs)
+        elif mode in ('td_q', 'td_sarsa'):
+            # TD-Q法またはSARSAモードの場合
+            from agent_td import AgentTD
+            return AgentTD(environment=environment, mode_sarsa=(mode == 'td_sarsa'), mode_table=mode_table,
+                           directory=directory, **kwargs)
+
+        raise ValueError('未知のモードです:{0}'.format(mode))
+
+
+def load_config(path):
+    """
+    設定ファイル(JSON)を読み込み
+    :param path: 設定ファイルのパス
+    :return: 実験設定のリスト(ファイルが1つの実験設定の場合も,{'experiments': [...]}の場合もリストで返す)
+    """
+    with open(path) as file:
+        config = json.load(file)
+
+    if isinstance(config, dict) and ('experiments' in config):
+        # 共通設定と実験ごとの設定が指定されている場合
+        common = {key: value for key, value in config.items() if key != 'experiments'}
+        return [dict(common, **experiment) for experiment in config['experiments']]
+    if isinstance(config, dict):
+        return [config]
+
+    return list(config)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='迷路の強化学習の実験を実施する')
+    parser.add_argument('--config', help='設定ファイル(JSON)のパス(1つの実験設定,実験設定のリスト,'
+                                         'または{"experiments": [...]}の形式)')
+    parser.add_argument('--output', default='output', help='出力先のディレクトリ')
+    parser.add_argument('--name', help='実験名(出力ディレクトリ名)')
+    parser.add_argument('--mode', choices=['User', 'Random', 'monte_carlo', 'dynamic_programing', 'td_q', 'td_sarsa'],
+                        help='モード')
+    group_table = parser.add_mutually_exclusive_group()
+    group_table.add_argument('--table', dest='mode_table', action='store_const', const=True, help='テーブルモード')
+    group_table.add_argument('--network', dest='mode_table', action='store_const', const=False,
+                             help='ニューラルネットワークモード')
+    parser.add_argument('--count-play', type=int, help='プレイ回数')
+    parser.add_argument('--step-max', type=int, help='最大ステップ数')
+    parser.add_argument('--count-loop-max', type=int, help='最大ループ数')
+    parser.add_argument('--epochs', type=int, help='エポック数')
+    parser.add_argument('--policy-stable', dest='count_policy_stable', type=int,
+                        help='貪欲方策がこのループ数連続で変化しない場合に終了する(0の場合は最大ループ数まで実施)')
+    parser.add_argument('--plateau', dest='count_plateau', type=int,
+                        help='ゴールまでの手数の直近の平均がこのループ数連続で改善しない場合に終了する(0の場合は判定しない)')
+    parser.add_argument('--seed', type=int, help='乱数のシード')
+    parser.add_argument('--maze', type=int, nargs=2, metavar=('WIDTH', 'HEIGHT'), help='生成する迷路のサイズ')
+    parser.add_argument('--braid', type=float, default=0.0, help='生成する迷路の行き止まりを除去する割合')
+    parser.add_argument('--backend', choices=['tensorflow', 'numpy'],
+                        help='ニューラルネットワークモードで使用するバックエンド')
+    parser.add_argument('--stats', dest='mode_stats', action='store_const', const=True, help='処理時間を集計する')
+    parser.add_argument('--no-display', dest='display_result', action='store_const', const=False,
+                        help='学習後の行動価値Qまたは価値Vを表示しない')
+    parser.add_argument('--dump', dest='dump_result', action='store_const', const=True,
+                        help='学習後の行動価値Qまたは価値Vをtable.csvに書き込む')
+    args = parser.parse_args(argv)
+
+    configs = load_config(args.config) if args.config else [dict()]
+
+    # コマンドラインの指定で設定を上書き
+    overrides = {key: getattr(args, key) for key in ('name', 'mode', 'mode_table', 'count_play', 'step_max',
+                                                     'count_loop_max', 'epochs', 'count_policy_stable',
+                                                     'count_plateau', 'seed', 'mode_stats',
+                                                     'display_result', 'dump_result')
+                 if getattr(args, key) is not None}
+    if args.maze is not None:
+        overrides['maze'] = {'width': args.maze[0], 'height': args.maze[1], 'braid': args.braid, 'seed': args.seed}
+    if ('name' in overrides) and (1 < len(configs)):
+        parser.error('複数の実験を実施する場合は--nameを指定できません')
+
+    count_failed = 0
+    for config in configs:
+        config = dict(config, **overrides)
+        if args.backend is not None:
+            config['agent'] = dict(config.get('agent', {}), backend=args.backend)
+        try:
+            experiment = Experiment(config, args.output)
+        except ValueError as error:
+            print('実験設定が不正です:{0}'.format(error), file=sys.stderr)
+            count_failed += 1
+            continue
+
+        print('start experiment:{0}'.format(experiment.settings['name']))
+        try:
+            result = experiment.run()
+        except Exception as error:
+            traceback.print_exc()
+            result = experiment.fail(error)
+            count_failed += 1
+        print('end experiment:{0} {1}'.format(result['name'], result['status']))
+
+    return 1 if 0 < count_failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,52 @@
 import numpy as np
 
+from maze_renderer import MazeRenderer
+
 
 class Maze:
-    def __init__(self):
+    # 有効な行動の組み合わせ(行動ごとのビットの和)ごとの有効な行動リスト
+    ACTIONS_EFFECTIVE_PATTERNS = tuple([action for action in range(4) if (code >> action) & 1] for code in range(16))
+    # 1ステップごとの参照にPythonのリストを使用する最大の状態数
+    SIZE_LIST_MAX = 1 << 16
+
+    def __init__(self, wall_horizontal=None, wall_vertical=None, start=(0, 0), goal=None):
         """
         コンストラクタ
+        :param wall_horizontal: 水平方向の壁[x座標, y座標(上端からの境界番号)](Noneの場合は既定の8x8の迷路)
+        :param wall_vertical: 垂直方向の壁[y座標, x座標(左端からの境界番号)](Noneの場合は既定の8x8の迷路)
+        :param start: スタート地点(x座標, y座標)
+        :param goal: ゴール地点(x座標, y座標)(Noneの場合は右下端)
         """
-        self.__position = np.zeros([2])
+        # 現在位置は状態ID(y座標 * 幅 + x座標)で保持する
+        self.__position = 0
         self.__is_play = False
         self.__count = 0
+        # 表示処理は初回の表示時に作成する
+        self.__renderer = None
+        if (wall_horizontal is not None) and (wall_vertical is not None):
+            # 壁の情報が指定された場合
+            self.__wall_horizontal = np.asarray(wall_horizontal)
+            self.__wall_vertical = np.asarray(wall_vertical)
+        else:
+            # 壁の情報が指定されていない場合は既定の迷路を使用
+            self.__set_wall_default()
+
+        if goal is None:
+            # ゴール地点の指定がない場合は右下端をゴール地点とする
+            goal = (self.width - 1, self.height - 1)
+        self.__start = np.array(start, dtype=np.int64)
+        self.__goal = np.array(goal, dtype=np.int64)
+        self.__start_id = self.get_status_id(self.__start)
+        self.__goal_id = self.get_status_id(self.__goal)
+
+        # 壁の情報から遷移先と有効な行動のテーブルを作成
+        self.__compile()
+
+    def __set_wall_default(self):
+        """
+        既定の8x8の迷路の壁を設定
+        :return: なし
+        """
         self.__wall_horizontal = np.array([[1, 1, 0, 0, 0, 0, 0, 0, 1],
                                            [1, 1, 0, 1, 1, 0, 0, 1, 1],
                                            [1, 0, 0, 0, 0, 1, 1, 1, 1],
@@ -30,9 +68,18 @@ class Maze:
     def status(self):
         """
         ステータス
-        現在位置
+        現在位置(x座標, y座標)
+        作成済みの読み取り専用の配列を返すため,変更する場合は複製すること
         """
-        return self.__position.copy()
+        return self.__statuses[self.__position]
+
+    @property
+    def status_id(self):
+        """
+        状態ID
+        現在位置を1次元にした番号(y座標 * 幅 + x座標)
+        """
+        return self.__position
 
     @property
     def is_play(self):
@@ -56,13 +103,78 @@ class Maze:
         """手数"""
         return self.__count
 
+    @property
+    def width(self):
+        """迷路の幅(x方向のマス数)"""
+        return self.__wall_horizontal.shape[0]
+
+    @property
+    def height(self):
+        """迷路の高さ(y方向のマス数)"""
+        return self.__wall_vertical.shape[0]
+
+    @property
+    def status_start(self):
+        """スタート地点(x座標, y座標)"""
+        return self.__start.copy()
+
+    @property
+    def status_goal(self):
+        """ゴール地点(x座標, y座標)"""
+        return self.__goal.copy()
+
+    @property
+    def wall_horizontal(self):
+        """
+        水平方向の壁
+        [x座標, y座標(上端からの境界番号)]で参照する(1:壁あり,0:壁なし)
+        参照のみとし変更しないこと
+        """
+        return self.__wall_horizontal
+
+    @property
+    def wall_vertical(self):
+        """
+        垂直方向の壁
+        [y座標, x座標(左端からの境界番号)]で参照する(1:壁あり,0:壁なし)
+        参照のみとし変更しないこと
+        """
+        return self.__wall_vertical
+
+    @property
+    def status_next_table(self):
+        """
+        遷移先テーブル
+        [y座標, x座標, 行動]で行動後の位置(x座標, y座標)を参照する(移動できない行動の場合は現在位置)
+        参照のみとし変更しないこと
+        """
+        return self.__status_next_table
+
+    @property
+    def status_next_id_table(self):
+        """
+        状態IDの遷移先テーブル
+        [状態ID, 行動]で行動後の状態IDを参照する(移動できない行動の場合は現在の状態ID)
+        参照のみとし変更しないこと
+        """
+        return self.__status_next_id_table
+
+    @property
+    def actions_effective_table(self):
+        """
+        有効行動テーブル
+        [y座標, x座標, 行動]で行動の有効性(True:有効,False:無効)を参照する
+        参照のみとし変更しないこと
+        """
+        return self.__actions_effective_table
+
     def start(self):
         """
         プレイを開始する
         :return:　なし
         """
-        # 位置をクリア
-        self.__position = np.zeros([2], dtype=np.int)
+        # 位置をスタート地点に設定
+        self.__position = self.__start_id
 
         # 手数をクリア
         self.__count = 0
@@ -79,39 +191,15 @@ class Maze:
         # 行動実施フラグ
         is_action = False
 
-        if direction == 0:
-            # 上方向に移動する場合
-            if self.__wall_horizontal[self.__position[0], self.__position[1]] == 0:
-                # 上方向に移動できる場合
-                self.__position[1] -= 1
-                is_action = True
-        elif direction == 1:
-            # 右方向に移動する場合
-            if self.__wall_vertical[self.__position[1], self.__position[0] + 1] == 0:
-                # 右方向に移動できる場合
-                self.__position[0] += 1
-                is_action = True
-        elif direction == 2:
-            # 下方向に移動する場合
-            if self.__wall_horizontal[self.__position[0], self.__position[1] + 1] == 0:
-                # 下方向に移動できる場合
-                self.__position[1] += 1
-                is_action = True
-        elif direction == 3:
-            # 左方向に移動する場合
-            if self.__wall_vertical[self.__position[1], self.__position[0]] == 0:
-                # 左方向に移動できる場合
-                self.__position[0] -= 1
-                is_action = True
-        else:
-            # 未定義の方向に移動する場合
-            pass
+        if (0 <= direction < 4) and (self.__actions_effective_codes[self.__position] >> direction) & 1:
+            # 移動できる場合
+            self.__position = int(self.__status_next_ids[self.__position * 4 + direction])
+            is_action = True
 
         if is_action:
             self.__count += 1
 
-        if (self.__position[0] == self.__wall_vertical.shape[0] - 1) \
-                and (self.__position[1] == self.__wall_horizontal.shape[0] - 1):
+        if self.__position == self.__goal_id:
             # ゴールした場合
             self.__is_play = False
 
@@ -120,120 +208,104 @@ class Maze:
     def get_actions_effective(self, status=None):
         """
         有効な行動リストを取得
+        :param status: 位置(x座標, y座標)または状態ID(Noneの場合は現在位置)
         :return: 有効な行動リスト
         """
         if status is None:
             status = self.__position
-        actions = list()
+        elif not isinstance(status, (int, np.integer)):
+            # 座標の場合は状態IDに変換
+            status = status[1] * self.width + status[0]
+
+        # 有効な行動の組み合わせごとに作成済みのリストを返すため変更しないこと
+        return self.ACTIONS_EFFECTIVE_PATTERNS[self.__actions_effective_codes[status]]
+
+    def get_status_id(self, status):
+        """
+        位置を状態IDに変換
+        :param status: 位置(x座標, y座標)(複数の位置の場合は(..., 2))
+        :return: 状態ID(y座標 * 幅 + x座標)
+        """
+        status = np.asarray(status)
+        status_id = status[..., 1] * self.width + status[..., 0]
+        if status_id.ndim == 0:
+            return int(status_id)
+
+        return status_id
 
-        if self.__wall_horizontal[status[0], status[1]] == 0:
-            # 上方向に移動できる場合
-            actions.append(0)
+    def get_status(self, status_id):
+        """
+        状態IDを位置に変換
+        :param status_id: 状態ID(複数の状態IDの配列も可)
+        :return: 位置(x座標, y座標)(複数の状態IDの場合は(..., 2))
+        """
+        return self.__statuses[status_id]
 
-        if self.__wall_vertical[status[1], status[0] + 1] == 0:
-            # 右方向に移動できる場合
-            actions.append(1)
+    def __compile(self):
+        """
+        壁の情報から遷移先テーブルと有効行動テーブルを作成
+        :return: なし
+        """
+        width = self.width
+        height = self.height
+        # 各位置の座標を取得
+        y, x = np.meshgrid(np.arange(height), np.arange(width), indexing='ij')
 
-        if self.__wall_horizontal[status[0], status[1] + 1] == 0:
-            # 下方向に移動できる場合
-            actions.append(2)
+        actions = np.empty([height, width, 4], dtype=bool)
+        # 上方向に移動できるか
+        actions[:, :, 0] = self.__wall_horizontal[x, y] == 0
+        # 右方向に移動できるか
+        actions[:, :, 1] = self.__wall_vertical[y, x + 1] == 0
+        # 下方向に移動できるか
+        actions[:, :, 2] = self.__wall_horizontal[x, y + 1] == 0
+        # 左方向に移動できるか
+        actions[:, :, 3] = self.__wall_vertical[y, x] == 0
 
-        if self.__wall_vertical[status[1], status[0]] == 0:
-            # 左方向に移動できる場合
-            actions.append(3)
+        # 各行動での座標の変化量(x座標, y座標)
+        delta = np.array([[0, -1], [1, 0], [0, 1], [-1, 0]])
+        status = np.stack([x, y], axis=-1)
+        # 移動できない行動の場合は現在位置に留まる
+        status_next = status[:, :, np.newaxis, :] + delta * actions[:, :, :, np.newaxis]
 
-        return actions
+        self.__actions_effective_table = actions
+        self.__status_next_table = status_next
+        # 状態IDごとの位置(読み取り専用)と遷移先の状態ID
+        self.__statuses = status.reshape(-1, 2)
+        self.__statuses.flags.writeable = False
+        self.__status_next_id_table = status_next[:, :, :, 1] * width + status_next[:, :, :, 0]
+        self.__status_next_id_table = self.__status_next_id_table.reshape(-1, 4)
+        # 状態IDごとの有効な行動の組み合わせ(行動ごとのビットの和)
+        codes = (actions.reshape(-1, 4) << np.arange(4, dtype=np.uint8)).sum(axis=1, dtype=np.uint8)
+        if codes.size <= self.SIZE_LIST_MAX:
+            # 小さい迷路の場合は1ステップごとの参照をPythonのリストで行う(NumPyの要素アクセスより高速なため)
+            self.__actions_effective_codes = codes.tolist()
+            self.__status_next_ids = self.__status_next_id_table.ravel().tolist()
+        else:
+            # 大きい迷路の場合はリストの作成時間とメモリを抑えるためNumPyの配列を直接参照
+            self.__actions_effective_codes = codes
+            self.__status_next_ids = self.__status_next_id_table.ravel()
 
-    def display(self, data=None, is_q=True):
+    @property
+    def renderer(self):
+        """
+        表示処理
+        初回の参照時に作成する(MazeRenderer)
+        """
+        if self.__renderer is None:
+            self.__renderer = MazeRenderer(self)
+
+        return self.__renderer
+
+    def display(self, data=None, is_q=True, is_force=True):
         """
         表示出力
         :param data: 行動価値Qまたは価値Vテーブル(is_qによる)
+        :param is_q: 行動価値Qテーブルかのフラグ(True:行動価値Q,False:価値V)
+        :param is_force: 最大表示回数(renderer.fps_max)にかかわらず表示するかのフラグ(テーブルの表示では常に表示する)
         :return: なし
         """
-
-        output = 'count:{0}\r\n'.format(self.__count)
-
-        for i in range(self.__wall_horizontal.shape[1]):
-            for j in range(self.__wall_horizontal.shape[0]):
-                if data is None:
-                    output += ' '
-                    output += ' ' if self.__wall_horizontal[j, i] == 0 else '-'
-                else:
-                    if is_q:
-                        # 行動価値Qの場合
-                        output += (',' if self.__wall_horizontal[j, i] == 0 else '-,') * 4
-                    else:
-                        # 価値Vの場合
-                        output += (',' if self.__wall_horizontal[j, i] == 0 else '-,') * 2
-            output += '\n\r'
-
-            if i < self.__wall_vertical.shape[0]:
-                if data is None:
-                    for j in range(self.__wall_vertical.shape[1]):
-                        output += ' ' if self.__wall_vertical[i, j] == 0 else '|'
-                        if (self.__position[0] == j) and (self.__position[1] == i):
-                            # プレイヤーが存在する位置の場合
-                            output += '○'
-                        elif (i == 0) and (j == 0):
-                            # スタート地点の場合
-                            output += 'S'
-                        elif (i == self.__wall_horizontal.shape[0] - 1) and (j == self.__wall_vertical.shape[0] - 1):
-                            # ゴール地点の場合
-                            output += 'G'
-                        else:
-                            # 上記以外の地点の場合
-                            output += ' '
-                    output += '\n\r'
-                else:
-                    if is_q:
-                        # 行動価値Qが指定された場合
-                        # 上方向の行動価値Qの値を出力するループ
-                        for j in range(data.shape[1]):
-                            output += '{0},,{1:.2f},,'.format(' ' if self.__wall_vertical[i, j] == 0 else '|', data[i, j, 0])
-                        output += '{0}\r\n'.format(' ' if self.__wall_vertical[i, data.shape[1]] == 0 else '|')
-
-                        # 左右方向の行動価値Qの値を出力するループ
-                        for j in range(data.shape[1]):
-                            point = ' '
-                            if (self.__position[0] == j) and (self.__position[1] == i):
-                                # プレイヤーが存在する位置の場合
-                                point = '○'
-                            elif (i == 0) and (j == 0):
-                                # スタート地点の場合
-                                point = 'S'
-                            elif (i == self.__wall_horizontal.shape[0] - 1) and (j == self.__wall_vertical.shape[0] - 1):
-                                # ゴール地点の場合
-                                point = 'G'
-                            else:
-                                # 上記以外の地点の場合
-                                point = ' '
-                            output += '{0},{1:.2f},{2},{3:.2f},'.format(' ' if self.__wall_vertical[i, j] == 0 else '|',
-                                                                        data[i, j, 3],
-                                                                        point,
-                                                                        data[i, j, 1])
-                        output += '{0}\r\n'.format(' ' if self.__wall_vertical[i, data.shape[1]] == 0 else '|')
-
-                        # 下方向の行動価値Qの値を出力するループ
-                        for j in range(data.shape[1]):
-                            output += '{0},,{1:.2f},,'.format(' ' if self.__wall_vertical[i, j] == 0 else '|', data[i, j, 2])
-                        output += '{0}\r\n'.format(' ' if self.__wall_vertical[i, data.shape[1]] == 0 else '|')
-                    else:
-                        # 価値Vが指定された場合
-                        for j in range(self.__wall_vertical.shape[1]):
-                            output += ',' if self.__wall_vertical[i, j] == 0 else '|,'
-                            if (i == 0) and (j == 0):
-                                # スタート地点の場合
-                                output += 'S:'
-                            elif (i == self.__wall_horizontal.shape[0] - 1) and (j == self.__wall_vertical.shape[0] - 1):
-                                # ゴール地点の場合
-                                output += 'G:'
-
-                            if j < data.shape[1]:
-                                # 価値Vの値が存在する場合
-                                output += '{0:.2f},'.format(data[i, j])
-                            else:
-                                # 上記以外の地点の場合
-                                output += ','
-                        output += '\n\r'
-
-        print(output)
+        if data is None:
+            # 現在の状態を表示
+            self.renderer.render(is_force)
+        else:
+            print(self.renderer.get_table(data, is_q))
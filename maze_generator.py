@@ -0,0 +1,110 @@
+import numpy as np
+
+from maze import Maze
+
+
+class MazeGenerator:
+    def __init__(self, seed=None):
+        """
+        コンストラクタ
+        任意のサイズの迷路を生成する
+        :param seed: 乱数のシード(Noneの場合は毎回異なる迷路を生成)
+        """
+        self.__random = np.random.default_rng(seed)
+
+    def create(self, width, height, braid=0.0, start=(0, 0), goal=None):
+        """
+        迷路を生成
+        サイドワインダー法で完全迷路(任意の2地点間の経路が1つのみ)を生成し,
+        braidの割合で行き止まりの壁を取り除いてループのある迷路にする
+        :param width: 迷路の幅(x方向のマス数)
+        :param height: 迷路の高さ(y方向のマス数)
+        :param braid: 行き止まりを取り除く割合(0.0:完全迷路,1.0:行き止まりをすべて取り除く)
+        :param start: スタート地点(x座標, y座標)
+        :param goal: ゴール地点(x座標, y座標)(Noneの場合は右下端)
+        :return: 生成した迷路(Maze)
+        """
+        if (width < 2) or (height < 2):
+            raise ValueError('迷路のサイズは2x2以上を指定してください:({0}, {1})'.format(width, height))
+        if goal is None:
+            # ゴール地点の指定がない場合は右下端をゴール地点とする
+            goal = (width - 1, height - 1)
+        for name, status in (('start', start), ('goal', goal)):
+            if not ((0 <= status[0] < width) and (0 <= status[1] < height)):
+                raise ValueError('{0}が迷路の範囲外です:{1}'.format(name, status))
+
+        wall_horizontal, wall_vertical = self.__create_perfect(width, height)
+        if 0 < braid:
+            # 行き止まりを取り除く場合
+            self.__remove_dead_ends(wall_horizontal, wall_vertical, braid)
+
+        return Maze(wall_horizontal, wall_vertical, start=start, goal=goal)
+
+    def __create_perfect(self, width, height):
+        """
+        サイドワインダー法で完全迷路の壁を生成
+        すべての行を一括で処理する
+        :param width: 迷路の幅
+        :param height: 迷路の高さ
+        :return: 水平方向の壁[x座標, y座標], 垂直方向の壁[y座標, x座標]
+        """
+        wall_horizontal = np.ones([width, height + 1], dtype=np.int8)
+        wall_vertical = np.ones([height, width + 1], dtype=np.int8)
+
+        # 最上段の行はすべて右方向につなげる
+        wall_vertical[0, 1:width] = 0
+
+        # 2段目以降の各マスで右方向への通路を閉じて区間を終えるかを決定(右端では必ず閉じる)
+        close = self.__random.random([height - 1, width]) < 0.5
+        close[:, -1] = True
+        # 閉じない場合は右方向に通路を作成
+        wall_vertical[1:, 1:width] = close[:, :-1]
+
+        # 各区間の範囲を算出(右端で必ず閉じるため区間は行をまたがない)
+        end = np.flatnonzero(close)
+        begin = np.concatenate([[0], end[:-1] + 1])
+        # 各区間から1マスを選んで上方向に通路を作成
+        selected = begin + (self.__random.random(begin.shape[0]) * (end - begin + 1)).astype(np.int64)
+        y = selected // width + 1
+        x = selected % width
+        wall_horizontal[x, y] = 0
+
+        return wall_horizontal, wall_vertical
+
+    def __remove_dead_ends(self, wall_horizontal, wall_vertical, braid):
+        """
+        行き止まりの壁を取り除く
+        取り除く壁は外周以外の壁からランダムに選択する
+        :param wall_horizontal: 水平方向の壁(直接変更する)
+        :param wall_vertical: 垂直方向の壁(直接変更する)
+        :param braid: 行き止まりを取り除く割合
+        :return: なし
+        """
+        width = wall_horizontal.shape[0]
+        height = wall_vertical.shape[0]
+        y, x = np.meshgrid(np.arange(height), np.arange(width), indexing='ij')
+
+        # 各マスの各方向(0:上,1:右,2:下,3:左)の壁の有無
+        wall = np.stack([wall_horizontal[x, y],
+                         wall_vertical[y, x + 1],
+                         wall_horizontal[x, y + 1],
+                         wall_vertical[y, x]], axis=-1) == 1
+
+        # 壁が3方向にある行き止まりのマスを割合に応じて選択
+        is_dead_end = (wall.sum(axis=-1) == 3) & (self.__random.random([height, width]) < braid)
+        y = y[is_dead_end]
+        x = x[is_dead_end]
+
+        # 外周以外の壁を候補としてランダムに1つ選択
+        candidate = wall[is_dead_end]
+        candidate[:, 0] &= 0 < y
+        candidate[:, 1] &= x < width - 1
+        candidate[:, 2] &= y < height - 1
+        candidate[:, 3] &= 0 < x
+        direction = np.argmax(np.where(candidate, self.__random.random(candidate.shape), -1), axis=-1)
+
+        # 選択した壁を取り除く
+        wall_horizontal[x[direction == 0], y[direction == 0]] = 0
+        wall_vertical[y[direction == 1], x[direction == 1] + 1] = 0
+        wall_horizontal[x[direction == 2], y[direction == 2] + 1] = 0
+        wall_vertical[y[direction == 3], x[direction == 3]] = 0
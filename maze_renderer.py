@@ -0,0 +1,187 @@
+import time
+
+import numpy as np
+
+
+class MazeRenderer:
+    def __init__(self, environment, fps_max=30):
+        """
+        コンストラクタ
+        迷路の表示用の文字列を作成する
+        壁とスタート地点,ゴール地点の表示は初回の作成時にキャッシュし,フレームごとにプレイヤーの位置のみを書き換える
+        :param environment: 環境(Maze)
+        :param fps_max: 1秒あたりの最大表示回数(0以下の場合は制限しない)
+        """
+        self.__environment = environment
+        self.__fps_max = fps_max
+        self.__time_last = None
+        # 壁のみの表示の文字列と各行の開始位置
+        self.__template = None
+        self.__offsets = None
+
+    @property
+    def fps_max(self):
+        """1秒あたりの最大表示回数(0以下の場合は制限しない)"""
+        return self.__fps_max
+
+    @fps_max.setter
+    def fps_max(self, fps_max):
+        self.__fps_max = fps_max
+
+    def render(self, is_force=False):
+        """
+        現在の状態を表示
+        前回の表示から最大表示回数の間隔が経過していない場合は表示しない
+        :param is_force: 間隔にかかわらず表示するかのフラグ
+        :return: 表示したか
+        """
+        now = time.monotonic()
+        if (not is_force) and (0 < self.__fps_max) and (self.__time_last is not None) \
+                and (now - self.__time_last < 1 / self.__fps_max):
+            # 前回の表示から間隔が経過していない場合
+            return False
+
+        print(self.get_frame())
+        self.__time_last = now
+
+        return True
+
+    def get_frame(self):
+        """
+        現在の状態の表示用の文字列を取得
+        :return: 文字列
+        """
+        if self.__template is None:
+            # 初回の場合は壁の表示を作成
+            self.__create_template()
+
+        # プレイヤーの位置の文字のみを置き換え
+        position = self.__environment.status
+        offset = self.__offsets[2 * position[1] + 1] + 2 * position[0] + 1
+
+        return 'count:{0}\r\n{1}○{2}'.format(self.__environment.count,
+                                             self.__template[:offset],
+                                             self.__template[offset + 1:])
+
+    def get_table(self, data, is_q=True):
+        """
+        行動価値Qまたは価値Vのテーブルの表示用の文字列を取得
+        :param data: 行動価値Qまたは価値Vテーブル(is_qによる)
+        :param is_q: 行動価値Qテーブルかのフラグ(True:行動価値Q,False:価値V)
+        :return: 文字列
+        """
+        lines = self.__get_table_lines(data, is_q)
+
+        return 'count:{0}\r\n'.format(self.__environment.count) + ''.join(line + end for line, end in lines)
+
+    def dump_csv(self, path, data, is_q=True, action=None):
+        """
+        行動価値Qまたは価値VのテーブルをCSVファイルに書き込み
+        迷路の1行を1行とし,各マスの値を1つずつ書き込む(壁などの表示用の文字は含めない)
+        :param path: 書き込み先のパス
+        :param data: 行動価値Qまたは価値Vテーブル(is_qによる)
+        :param is_q: 行動価値Qテーブルかのフラグ(True:行動価値Q,False:価値V)
+        :param action: 行動価値Qの場合に書き込む行動(Noneの場合は各マスの行動価値Qの最大値)
+        :return: なし
+        """
+        data = np.asarray(data, dtype=np.float64)
+        shape = (self.__environment.height, self.__environment.width) + ((4, ) if is_q else ())
+        if data.shape != shape:
+            raise ValueError('テーブルの形状が迷路と異なります:{0}'.format(data.shape))
+        if is_q:
+            # 行動価値Qの場合は指定の行動の値または最大値を各マスの値とする
+            data = data.max(axis=2) if action is None else data[:, :, action]
+        np.savetxt(path, data, fmt='%.10g', delimiter=',', encoding='utf-8')
+
+    def __create_template(self):
+        """
+        壁とスタート地点,ゴール地点の表示用の文字列を作成
+        :return: なし
+        """
+        environment = self.__environment
+        wall_horizontal = environment.wall_horizontal
+        wall_vertical = environment.wall_vertical
+        height = wall_vertical.shape[0]
+        points = self.__get_points(' ')
+
+        lines = list()
+        for i in range(height + 1):
+            # 水平方向の壁
+            lines.append(''.join(np.where(wall_horizontal[:, i] == 0, '  ', ' -')))
+            if i < height:
+                # 垂直方向の壁と各地点
+                walls = np.where(wall_vertical[i] == 0, ' ', '|')
+                lines.append(''.join(wall + point for wall, point in zip(walls, points[i] + [' '])))
+
+        self.__offsets = np.cumsum([0] + [len(line) + 2 for line in lines]).tolist()
+        self.__template = ''.join(line + '\n\r' for line in lines)
+
+    def __get_points(self, blank):
+        """
+        各地点の表示文字を取得
+        :param blank: スタート地点,ゴール地点以外の地点の文字
+        :return: 各地点の文字のリスト[y座標][x座標]
+        """
+        environment = self.__environment
+        points = [[blank] * environment.width for i in range(environment.height)]
+        goal = environment.status_goal
+        start = environment.status_start
+        points[goal[1]][goal[0]] = 'G'
+        points[start[1]][start[0]] = 'S'
+
+        return points
+
+    def __get_table_lines(self, data, is_q):
+        """
+        行動価値Qまたは価値Vのテーブルの各行を作成
+        :param data: 行動価値Qまたは価値Vテーブル(is_qによる)
+        :param is_q: 行動価値Qテーブルかのフラグ(True:行動価値Q,False:価値V)
+        :return: (行の文字列, 改行文字)のリスト
+        """
+        environment = self.__environment
+        wall_horizontal = environment.wall_horizontal
+        wall_vertical = environment.wall_vertical
+        height = wall_vertical.shape[0]
+        # 値はまとめて文字列に変換(np.char.modより%演算子の方が高速なため)
+        data = np.asarray(data, dtype=np.float64)
+        values = ['%.2f' % value for value in data.ravel().tolist()]
+        values = np.array(values, dtype=object).reshape(data.shape).tolist()
+        # 水平方向の壁の1マスあたりの文字列
+        horizontal = (',' * 4, '-,' * 4) if is_q else (',' * 2, '-,' * 2)
+
+        lines = list()
+        if is_q:
+            points = self.__get_points(' ')
+            position = environment.status
+            points[position[1]][position[0]] = '○'
+        else:
+            points = self.__get_points('')
+        for i in range(height + 1):
+            # 水平方向の壁
+            lines.append((''.join(horizontal[wall] for wall in (wall_horizontal[:, i] != 0).tolist()), '\n\r'))
+            if height <= i:
+                continue
+
+            walls = np.where(wall_vertical[i] == 0, ' ', '|').tolist()
+            if is_q:
+                # 行動価値Qの場合は上,左右,下の3行で出力
+                q = values[i]
+                end = walls[len(q)]
+                lines.append((''.join('{0},,{1},,'.format(walls[j], q[j][0]) for j in range(len(q))) + end, '\r\n'))
+                lines.append((''.join('{0},{1},{2},{3},'.format(walls[j], q[j][3], points[i][j], q[j][1])
+                                      for j in range(len(q))) + end, '\r\n'))
+                lines.append((''.join('{0},,{1},,'.format(walls[j], q[j][2]) for j in range(len(q))) + end, '\r\n'))
+            else:
+                # 価値Vの場合
+                v = values[i]
+                cells = list()
+                for j in range(len(walls)):
+                    cell = ',' if walls[j] == ' ' else '|,'
+                    if j < len(points[i]) and points[i][j]:
+                        # スタート地点またはゴール地点の場合
+                        cell += points[i][j] + ':'
+                    cell += (v[j] + ',') if j < len(v) else ','
+                    cells.append(cell)
+                lines.append((''.join(cells), '\n\r'))
+
+        return lines
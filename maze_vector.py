@@ -0,0 +1,105 @@
+import numpy as np
+
+
+class VectorMaze:
+    def __init__(self, environment, count):
+        """
+        コンストラクタ
+        同一の迷路を複数同時にプレイするための環境
+        :param environment: 壁の情報を参照する迷路(Maze)
+        :param count: 同時にプレイする迷路の数
+        """
+        self.__count_environment = count
+        # 迷路の遷移先テーブルと有効行動テーブルを共有
+        self.__status_next_table = environment.status_next_table
+        self.__actions_effective_table = environment.actions_effective_table
+        # スタート地点とゴール地点
+        self.__start = environment.status_start
+        self.__goal = environment.status_goal
+        self.__position = np.zeros([count, 2], dtype=np.int64)
+        self.__is_play = np.zeros([count], dtype=bool)
+        self.__count = np.zeros([count], dtype=np.int64)
+        self.__index = np.arange(count)
+
+    @property
+    def size(self):
+        """同時にプレイする迷路の数"""
+        return self.__count_environment
+
+    @property
+    def status(self):
+        """
+        ステータス
+        各迷路の現在位置(迷路の数, 2)
+        """
+        return self.__position.copy()
+
+    @property
+    def is_play(self):
+        """
+        各迷路のプレイ中フラグ
+        True:プレイ中
+        False:非プレイ中(ゴール済み)
+        """
+        return self.__is_play.copy()
+
+    @property
+    def count(self):
+        """各迷路の手数"""
+        return self.__count.copy()
+
+    def start(self, indices=None):
+        """
+        プレイを開始する
+        :param indices: 開始する迷路のインデックス(Noneの場合はすべての迷路)
+        :return: なし
+        """
+        if indices is None:
+            # すべての迷路を開始する場合
+            indices = self.__index
+
+        # 位置と手数をクリアしてプレイ中に変更
+        self.__position[indices] = self.__start
+        self.__count[indices] = 0
+        self.__is_play[indices] = True
+
+    def set_action(self, directions):
+        """
+        すべての迷路のプレイヤーの位置を一括で変更
+        ゴール済みの迷路では位置を変更しない
+        :param directions: 各迷路の移動方向[0:上,1:右,2:下,3:左](迷路の数)
+        :return: 行動後の位置(迷路の数, 2), 行動成功フラグ(迷路の数), プレイ中フラグ(迷路の数),
+                 行動後の有効な行動のマスク(迷路の数, 4)
+        """
+        directions = np.asarray(directions, dtype=np.int64)
+        # 未定義の方向は移動できない行動として扱う
+        is_defined = (0 <= directions) & (directions < 4)
+        directions_safe = np.where(is_defined, directions, 0)
+
+        x = self.__position[:, 0]
+        y = self.__position[:, 1]
+
+        # 選択した行動が実行できるかを判定
+        is_action = self.__actions_effective_table[y, x, directions_safe] & is_defined & self.__is_play
+
+        # 行動できる迷路のみ位置と手数を更新
+        self.__position = np.where(is_action[:, np.newaxis],
+                                   self.__status_next_table[y, x, directions_safe],
+                                   self.__position)
+        self.__count += is_action
+
+        # ゴールした迷路をプレイ終了に変更
+        self.__is_play &= ~(self.__position == self.__goal).all(axis=1)
+
+        return self.__position.copy(), is_action, self.__is_play.copy(), self.get_actions_effective()
+
+    def get_actions_effective(self, status=None):
+        """
+        有効な行動のマスクを取得
+        :param status: 位置(迷路の数, 2)(Noneの場合は各迷路の現在位置)
+        :return: 有効な行動のマスク(迷路の数, 4)(True:有効,False:無効)
+        """
+        if status is None:
+            status = self.__position
+
+        return self.__actions_effective_table[status[:, 1], status[:, 0]]
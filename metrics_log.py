@@ -0,0 +1,219 @@
+import collections
+import json
+import math
+
+import numpy as np
+
+
+class RollingWindow:
+    def __init__(self, size=100):
+        """
+        コンストラクタ
+        直近size個の値の統計量を保持する
+        値はリングバッファに保持し,平均は合計を,最小値は単調増加のキューを更新して追加ごとにO(1)で算出する
+        パーセンタイルは参照時にウィンドウ内の値から算出する(ウィンドウのサイズのみに比例し,追加した値の総数によらない)
+        :param size: ウィンドウのサイズ
+        """
+        if size < 1:
+            raise ValueError('ウィンドウのサイズは1以上を指定してください:{0}'.format(size))
+        self.__size = size
+        self.__values = np.zeros(size)
+        self.__count = 0
+        self.__total = 0.0
+        self.__last = None
+        # ウィンドウ内の最小値の候補((追加順の番号, 値)の値が単調増加のキュー)
+        self.__minimum = collections.deque()
+
+    def __len__(self):
+        """ウィンドウ内の値の数"""
+        return min(self.__count, self.__size)
+
+    @property
+    def count(self):
+        """追加した値の総数"""
+        return self.__count
+
+    @property
+    def last(self):
+        """最後に追加した値(値がない場合はNone)"""
+        return self.__last
+
+    @property
+    def mean(self):
+        """ウィンドウ内の平均(値がない場合はNone)"""
+        if self.__count == 0:
+            return None
+
+        return self.__total / len(self)
+
+    @property
+    def min(self):
+        """ウィンドウ内の最小値(値がない場合はNone)"""
+        if self.__count == 0:
+            return None
+
+        return self.__minimum[0][1]
+
+    def append(self, value):
+        """
+        値を追加
+        ウィンドウが満たされている場合は最も古い値を取り除く
+        :param value: 値(最後の値と最小値は追加した値をそのまま返す)
+        :return: なし
+        """
+        index = self.__count % self.__size
+        if self.__size <= self.__count:
+            # ウィンドウが満たされている場合は最も古い値を取り除く
+            self.__total -= self.__values[index]
+            if self.__minimum[0][0] <= self.__count - self.__size:
+                self.__minimum.popleft()
+        self.__values[index] = value
+        self.__total += value
+        self.__last = value
+
+        # 追加した値以上の候補は最小値にならないため取り除く
+        while self.__minimum and (value <= self.__minimum[-1][1]):
+            self.__minimum.pop()
+        self.__minimum.append((self.__count, value))
+        self.__count += 1
+
+    def percentile(self, q):
+        """
+        ウィンドウ内のパーセンタイルを算出
+        :param q: パーセント(0から100)
+        :return: パーセンタイル(値がない場合はNone)
+        """
+        if self.__count == 0:
+            return None
+
+        return float(np.percentile(self.__values[:len(self)], q))
+
+
+class MetricsLog:
+    def __init__(self, path=None, size_window=100, size_buffer=100, size_curve=1000):
+        """
+        コンストラクタ
+        ループごとの学習の記録(ゴールまでの手数,学習時間,損失など)を受け取り,
+        ゴールまでの手数の直近の統計量を一定のメモリで保持してJSON Lines形式のファイルに書き込む
+        記録はsize_buffer件ごとにまとめて書き込む(closeまたはflushで残りを書き込む)
+        ゴールまでの手数の推移は最大size_curve件に間引いて保持する(超えた場合は1つおきに間引いて間隔を倍にする)
+        :param path: 書き込み先のパス(Noneの場合はファイルに書き込まない)
+        :param size_window: 統計量を算出するウィンドウのサイズ
+        :param size_buffer: まとめて書き込む記録の件数
+        :param size_curve: 間引いたゴールまでの手数の推移の最大件数(2以上)
+        """
+        if size_curve < 2:
+            raise ValueError('推移の最大件数は2以上を指定してください:{0}'.format(size_curve))
+        self.__path = path
+        self.__size_buffer = size_buffer
+        self.__window = RollingWindow(size_window)
+        self.__size_curve = size_curve
+        self.__curve = list()
+        self.__interval_curve = 1
+        self.__buffer = list()
+        self.__file = None
+        if path is not None:
+            self.__file = open(path, 'w', encoding='utf-8')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def window(self):
+        """ゴールまでの手数の直近の統計量(RollingWindow)"""
+        return self.__window
+
+    @property
+    def curve(self):
+        """間引いたゴールまでの手数の推移(interval_curve件ごとの値のリスト)"""
+        return list(self.__curve)
+
+    @property
+    def interval_curve(self):
+        """間引いたゴールまでの手数の推移の間隔(件数)"""
+        return self.__interval_curve
+
+    @property
+    def path(self):
+        """書き込み先のパス"""
+        return self.__path
+
+    def add(self, loop, count_to_goal=None, time_fit=None, loss=None, **values):
+        """
+        1ループの記録を追加
+        :param loop: ループのインデックス
+        :param count_to_goal: ゴールまでの手数(プレイしない場合はNone)
+        :param time_fit: 学習時間(秒)
+        :param loss: 学習の損失
+        :param values: その他の記録する値
+        :return: 追加した記録
+        """
+        if count_to_goal is not None:
+            if self.__window.count % self.__interval_curve == 0:
+                # 推移に残す間隔の値の場合
+                self.__curve.append(count_to_goal)
+                if self.__size_curve < len(self.__curve):
+                    # 最大件数を超えた場合は1つおきに間引いて間隔を倍にする
+                    self.__curve = self.__curve[::2]
+                    self.__interval_curve *= 2
+            self.__window.append(count_to_goal)
+        record = {'loop': loop, 'count_to_goal': count_to_goal, 'time_fit': time_fit, 'loss': self.__get_number(loss)}
+        record.update(values)
+
+        if self.__file is not None:
+            # ファイルに書き込む場合
+            self.__buffer.append(json.dumps(record, ensure_ascii=False))
+            if self.__size_buffer <= len(self.__buffer):
+                # 書き込み待ちの記録が指定件数に達した場合
+                self.flush()
+
+        return record
+
+    def get_summary(self):
+        """
+        ゴールまでの手数の直近の統計量を取得
+        :return: {'count', 'last', 'mean', 'min', 'p50', 'p90'}
+        """
+        window = self.__window
+        return {'count': window.count,
+                'last': window.last,
+                'mean': window.mean,
+                'min': window.min,
+                'p50': window.percentile(50),
+                'p90': window.percentile(90)}
+
+    def flush(self):
+        """
+        書き込み待ちの記録をファイルに書き込み
+        :return: なし
+        """
+        if (self.__file is not None) and self.__buffer:
+            self.__file.write('\n'.join(self.__buffer) + '\n')
+            self.__file.flush()
+            self.__buffer = list()
+
+    def close(self):
+        """
+        書き込み待ちの記録を書き込んでファイルを閉じる
+        :return: なし
+        """
+        if self.__file is not None:
+            self.flush()
+            self.__file.close()
+            self.__file = None
+
+    @staticmethod
+    def __get_number(value):
+        """
+        JSONに書き込める数値に変換
+        :param value: 値
+        :return: 数値(Noneまたは有限でない場合はNone)
+        """
+        if value is None:
+            return None
+        value = float(value)
+
+        return value if math.isfinite(value) else None
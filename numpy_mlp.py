@@ -0,0 +1,191 @@
+import numpy as np
+
+
+class History:
+    def __init__(self):
+        """
+        コンストラクタ
+        学習の経過(tf.keras.callbacks.Historyと同じ形式)
+        """
+        self.history = {'loss': list()}
+
+
+class NumpyMLP:
+    def __init__(self, sizes, learning_rate=0.001, beta_1=0.9, beta_2=0.999, epsilon=1e-7):
+        """
+        コンストラクタ
+        NumPyで実装した全結合のニューラルネットワーク(隠れ層の活性化関数はReLU,出力層は恒等関数,損失は平均二乗誤差,最適化はAdam)
+        tf.keras.models.Sequentialのうちエージェントが使用するメソッドと同じ引数と戻り値のメソッドを持ち,
+        重みもDense層のget_weightsと同じ形式((入力数, 出力数)の重み, (出力数)のバイアスの順)のため同じファイルを読み書きできる
+        :param sizes: 各層のユニット数(入力層から出力層まで)
+        :param learning_rate: 学習率
+        :param beta_1: Adamの1次モーメントの減衰率
+        :param beta_2: Adamの2次モーメントの減衰率
+        :param epsilon: Adamのゼロ除算防止の値
+        """
+        self.__sizes = list(sizes)
+        self.__learning_rate = learning_rate
+        self.__beta_1 = beta_1
+        self.__beta_2 = beta_2
+        self.__epsilon = epsilon
+
+        # 重みはGlorotの一様分布,バイアスは0で初期化(tf.keras.layers.Denseの既定値と同じ)
+        self.__weights = list()
+        for size_input, size_output in zip(self.__sizes[:-1], self.__sizes[1:]):
+            limit = np.sqrt(6 / (size_input + size_output))
+            self.__weights.append(np.random.uniform(-limit, limit, (size_input, size_output)))
+            self.__weights.append(np.zeros(size_output))
+        self.__m = [np.zeros_like(weight) for weight in self.__weights]
+        self.__v = [np.zeros_like(weight) for weight in self.__weights]
+        self.__count_update = 0
+
+    def get_weights(self):
+        """
+        重みを取得
+        :return: 重みのリスト(層ごとに重み, バイアスの順)
+        """
+        return [weight.copy() for weight in self.__weights]
+
+    def set_weights(self, weights):
+        """
+        重みを設定
+        :param weights: 重みのリスト(層ごとに重み, バイアスの順)
+        :return: なし
+        """
+        if len(weights) != len(self.__weights):
+            raise ValueError('重みの数が異なります:{0} != {1}'.format(len(weights), len(self.__weights)))
+        for weight, weight_new in zip(self.__weights, weights):
+            if weight.shape != np.shape(weight_new):
+                raise ValueError('重みの形状が異なります:{0} != {1}'.format(weight.shape, np.shape(weight_new)))
+        self.__weights = [np.array(weight, dtype=np.float64) for weight in weights]
+
+    def summary(self):
+        """
+        モデルの概要を出力
+        :return: なし
+        """
+        print('NumpyMLP')
+        count = 0
+        for i, (size_input, size_output) in enumerate(zip(self.__sizes[:-1], self.__sizes[1:])):
+            count_params = (size_input + 1) * size_output
+            count += count_params
+            print('　　dense_{0}: {1} -> {2} ({3})  params: {4}'.format(
+                i, size_input, size_output, 'relu' if i < len(self.__sizes) - 2 else 'linear', count_params))
+        print('Total params: {0}'.format(count))
+
+    def predict(self, x, batch_size=None, verbose=0):
+        """
+        推論
+        :param x: 入力(データ数, 入力数)
+        :param batch_size: 未使用(tf.kerasとの互換のため)
+        :param verbose: 未使用(tf.kerasとの互換のため)
+        :return: 出力(データ数, 出力数)
+        """
+        return self.__forward(np.asarray(x, dtype=np.float64))[-1]
+
+    def predict_on_batch(self, x):
+        """
+        1つのバッチで推論(tf.kerasとの互換のため,predictと同じ)
+        :param x: 入力(データ数, 入力数)
+        :return: 出力(データ数, 出力数)
+        """
+        return self.predict(x)
+
+    def train_on_batch(self, x, y, sample_weight=None):
+        """
+        1つのバッチで重みを1回更新
+        :param x: 入力(データ数, 入力数)
+        :param y: 教師データ(データ数, 出力数)または(データ数)
+        :param sample_weight: データごとの損失の重み(データ数)
+        :return: 更新前の損失
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64).reshape(x.shape[0], -1)
+        outputs = self.__forward(x)
+
+        # データごとの平均二乗誤差を重み付けしてデータ数で平均(tf.kerasの既定の集約方法と同じ)
+        error = outputs[-1] - y
+        weight = np.ones(x.shape[0]) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+        loss = float((weight * (error ** 2).mean(axis=1)).sum() / x.shape[0])
+        gradient = 2 * error * (weight / (x.shape[0] * y.shape[1]))[:, np.newaxis]
+
+        self.__update(self.__backward(outputs, gradient))
+
+        return loss
+
+    def fit(self, x, y, epochs=1, batch_size=32, verbose=1, shuffle=True):
+        """
+        学習
+        :param x: 入力(データ数, 入力数)
+        :param y: 教師データ(データ数, 出力数)または(データ数)
+        :param epochs: エポック数
+        :param batch_size: バッチサイズ
+        :param verbose: 0以外の場合は学習後に最後のエポックの損失を出力する
+        :param shuffle: エポックごとにデータの順序を入れ替えるかのフラグ
+        :return: 学習の経過(History)
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64).reshape(x.shape[0], -1)
+        history = History()
+        for i in range(epochs):
+            indices = np.random.permutation(x.shape[0]) if shuffle else np.arange(x.shape[0])
+            loss = 0.0
+            for begin in range(0, x.shape[0], batch_size):
+                batch = indices[begin:begin + batch_size]
+                loss += self.train_on_batch(x[batch], y[batch]) * batch.shape[0]
+            history.history['loss'].append(loss / max(1, x.shape[0]))
+
+        if verbose and history.history['loss']:
+            print('Epoch {0}/{0} - loss: {1:.4f}'.format(epochs, history.history['loss'][-1]))
+
+        return history
+
+    def __forward(self, x):
+        """
+        順伝播
+        :param x: 入力(データ数, 入力数)
+        :return: 各層の出力のリスト(入力層から出力層まで)
+        """
+        outputs = [x]
+        count_layer = len(self.__weights) // 2
+        for i in range(count_layer):
+            x = x @ self.__weights[2 * i] + self.__weights[2 * i + 1]
+            if i < count_layer - 1:
+                # 隠れ層の場合
+                x = np.maximum(x, 0)
+            outputs.append(x)
+
+        return outputs
+
+    def __backward(self, outputs, gradient):
+        """
+        逆伝播
+        :param outputs: 各層の出力のリスト
+        :param gradient: 出力層の出力に対する損失の勾配(データ数, 出力数)
+        :return: 各重みの勾配のリスト
+        """
+        gradients = [None] * len(self.__weights)
+        for i in range(len(self.__weights) // 2 - 1, -1, -1):
+            gradients[2 * i] = outputs[i].T @ gradient
+            gradients[2 * i + 1] = gradient.sum(axis=0)
+            if 0 < i:
+                # ReLUの勾配(出力が0の場合は0)
+                gradient = (gradient @ self.__weights[2 * i].T) * (outputs[i] > 0)
+
+        return gradients
+
+    def __update(self, gradients):
+        """
+        Adamで重みを更新
+        :param gradients: 各重みの勾配のリスト
+        :return: なし
+        """
+        self.__count_update += 1
+        learning_rate = (self.__learning_rate * np.sqrt(1 - self.__beta_2 ** self.__count_update)
+                         / (1 - self.__beta_1 ** self.__count_update))
+        for weight, gradient, m, v in zip(self.__weights, gradients, self.__m, self.__v):
+            m *= self.__beta_1
+            m += (1 - self.__beta_1) * gradient
+            v *= self.__beta_2
+            v += (1 - self.__beta_2) * gradient ** 2
+            weight -= learning_rate * m / (np.sqrt(v) + self.__epsilon)
@@ -0,0 +1,159 @@
+import time
+
+
+class PlayStats:
+    # 計測する処理
+    PHASES = ('get_action', 'set_action', 'get_actions_effective', 'get_reward', 'get_q', 'append')
+
+    def __init__(self):
+        """
+        コンストラクタ
+        プレイの1ステップを構成する処理ごとの呼び出し回数と累積処理時間を集計する
+        """
+        self.__count = dict()
+        self.__time = dict()
+        self.__count_step = 0
+        self.__count_retry = 0
+        self.__count_episode = 0
+        self.reset()
+
+    @staticmethod
+    def clock():
+        """
+        計測に使用する時計
+        :return: 時刻(秒)
+        """
+        return time.perf_counter()
+
+    @staticmethod
+    def clock_null():
+        """
+        計測しない場合に使用する時計
+        :return: 0
+        """
+        return 0.0
+
+    @property
+    def count(self):
+        """処理ごとの呼び出し回数"""
+        return dict(self.__count)
+
+    @property
+    def time(self):
+        """処理ごとの累積処理時間(秒)"""
+        return dict(self.__time)
+
+    @property
+    def count_step(self):
+        """ステップ数(無効な行動を含む)"""
+        return self.__count_step
+
+    @property
+    def count_retry(self):
+        """無効な行動により再度行動した回数"""
+        return self.__count_retry
+
+    @property
+    def count_episode(self):
+        """プレイ回数"""
+        return self.__count_episode
+
+    def reset(self):
+        """
+        集計をクリア
+        :return: なし
+        """
+        self.__count = {phase: 0 for phase in self.PHASES}
+        self.__time = {phase: 0.0 for phase in self.PHASES}
+        self.__count_step = 0
+        self.__count_retry = 0
+        self.__count_episode = 0
+
+    def add(self, phase, elapsed, count=1):
+        """
+        処理の呼び出しを集計
+        :param phase: 処理名
+        :param elapsed: 処理時間(秒)
+        :param count: 呼び出し回数
+        :return: なし
+        """
+        self.__count[phase] += count
+        self.__time[phase] += elapsed
+
+    def wrap(self, phase, function):
+        """
+        呼び出しごとに処理時間を集計する処理を作成
+        ループの外で1回だけ作成して使用する(集計しない場合は元の処理をそのまま使用すれば計測の負荷がかからない)
+        :param phase: 処理名
+        :param function: 処理
+        :return: 処理時間を集計する処理(引数と戻り値は元の処理と同じ)
+        """
+        clock = self.clock
+
+        def wrapped(*args, **kwargs):
+            time_start = clock()
+            result = function(*args, **kwargs)
+            self.add(phase, clock() - time_start)
+            return result
+
+        return wrapped
+
+    def add_count_step(self, can_action):
+        """
+        1ステップの回数を集計
+        処理時間はwrapで作成した処理またはadd_stepで集計する
+        :param can_action: 行動が実行できたか
+        :return: なし
+        """
+        self.__count_step += 1
+        if not can_action:
+            self.__count_retry += 1
+
+    def add_step(self, times, can_action, is_sarsa):
+        """
+        1ステップの処理時間を集計
+        :param times: 各処理の境界の時刻
+                      (有効行動の取得開始, 行動の取得開始, 行動の実施開始, 行動後の有効行動の取得開始,
+                       報酬の取得開始, 次回の行動の取得開始, 行動価値Qの取得開始, 経験の追加開始, 経験の追加終了)
+        :param can_action: 行動が実行できたか
+        :param is_sarsa: 次回の行動を取得したか(SARSAモード)
+        :return: なし
+        """
+        self.add('get_actions_effective', (times[1] - times[0]) + (times[4] - times[3]), 2)
+        self.add('get_action', (times[2] - times[1]) + (times[6] - times[5]), 2 if is_sarsa else 1)
+        self.add('set_action', times[3] - times[2])
+        self.add('get_reward', times[5] - times[4])
+        self.add('get_q', times[7] - times[6])
+        self.add('append', times[8] - times[7])
+        self.add_count_step(can_action)
+
+    def add_episode(self):
+        """
+        プレイ回数を集計
+        :return: なし
+        """
+        self.__count_episode += 1
+
+    def to_dict(self):
+        """
+        集計結果を辞書に変換
+        :return: 集計結果
+        """
+        return {'count_step': self.__count_step,
+                'count_retry': self.__count_retry,
+                'count_episode': self.__count_episode,
+                'phases': {phase: {'count': self.__count[phase], 'time': self.__time[phase]}
+                           for phase in self.PHASES}}
+
+    def __str__(self):
+        time_total = sum(self.__time.values())
+        lines = ['ステップ数：{0} 再行動回数：{1} プレイ回数：{2}'.format(self.__count_step, self.__count_retry,
+                                                           self.__count_episode)]
+        for phase in self.PHASES:
+            count = self.__count[phase]
+            elapsed = self.__time[phase]
+            lines.append('　　{0:<22} 回数：{1:>10} 時間：{2:>10.4f}秒 割合：{3:>6.1%} 平均：{4:>8.2f}μ秒'.format(
+                phase, count, elapsed, elapsed / time_total if 0 < time_total else 0.0,
+                elapsed / count * 1e6 if 0 < count else 0.0))
+
+        return '\n'.join(lines)
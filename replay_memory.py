@@ -0,0 +1,90 @@
+import numpy as np
+
+
+class ReplayMemory:
+    def __init__(self, capacity=10000, alpha=0.6, beta=0.4, priority_minimum=0.01):
+        """
+        コンストラクタ
+        優先度付き経験再生のためのメモリ
+        容量を超えた場合は古い経験から上書きする
+        :param capacity: 保持する経験の最大数
+        :param alpha: 優先度をサンプリング確率に反映する度合い(0の場合は一様にサンプリング)
+        :param beta: サンプリング確率の偏りを補正する重みの度合い(0の場合は補正しない)
+        :param priority_minimum: 優先度の最小値(TD誤差が0の経験もサンプリングされるようにするため)
+        """
+        self.__capacity = capacity
+        self.__alpha = alpha
+        self.__beta = beta
+        self.__priority_minimum = priority_minimum
+        self.__count = 0
+        self.__position = 0
+        self.__status = np.zeros([capacity, 2], dtype=np.int64)
+        self.__action = np.zeros([capacity], dtype=np.int64)
+        self.__reward = np.zeros([capacity])
+        self.__status_next = np.zeros([capacity, 2], dtype=np.int64)
+        self.__action_next = np.zeros([capacity], dtype=np.int64)
+        self.__is_done = np.zeros([capacity], dtype=bool)
+        self.__priority = np.zeros([capacity])
+
+    def __len__(self):
+        """保持している経験の数"""
+        return self.__count
+
+    def add(self, status, action, reward, status_next, action_next, is_done):
+        """
+        経験を一括で追加
+        追加した経験の優先度は保持している経験の最大の優先度とする(少なくとも1回はサンプリングされやすくするため)
+        :param status: 行動前の状態(経験の数, 2)
+        :param action: 行動(経験の数)
+        :param reward: 報酬(経験の数)
+        :param status_next: 行動後の状態(経験の数, 2)
+        :param action_next: 行動後の状態の行動(経験の数)
+        :param is_done: プレイ終了フラグ(経験の数)
+        :return: なし
+        """
+        count = len(action)
+        if self.__capacity < count:
+            # 容量を超える場合は新しい経験のみを追加
+            status, action, reward = status[-self.__capacity:], action[-self.__capacity:], reward[-self.__capacity:]
+            status_next, action_next = status_next[-self.__capacity:], action_next[-self.__capacity:]
+            is_done = is_done[-self.__capacity:]
+            count = self.__capacity
+
+        priority = self.__priority[:self.__count].max() if 0 < self.__count else 1.0
+        indices = (self.__position + np.arange(count)) % self.__capacity
+        self.__status[indices] = status
+        self.__action[indices] = action
+        self.__reward[indices] = reward
+        self.__status_next[indices] = status_next
+        self.__action_next[indices] = action_next
+        self.__is_done[indices] = is_done
+        self.__priority[indices] = priority
+
+        self.__position = (self.__position + count) % self.__capacity
+        self.__count = min(self.__count + count, self.__capacity)
+
+    def sample(self, size_batch):
+        """
+        優先度に応じた確率で経験をサンプリング
+        :param size_batch: バッチサイズ
+        :return: インデックス, 補正用の重み, 行動前の状態, 行動, 報酬, 行動後の状態, 行動後の状態の行動, プレイ終了フラグ
+        """
+        probability = self.__priority[:self.__count] ** self.__alpha
+        probability /= probability.sum()
+        indices = np.random.choice(self.__count, size_batch, p=probability)
+
+        # サンプリング確率の偏りを補正する重み(最大値を1に正規化)
+        weights = (self.__count * probability[indices]) ** -self.__beta
+        weights /= weights.max()
+
+        return (indices, weights, self.__status[indices], self.__action[indices], self.__reward[indices],
+                self.__status_next[indices], self.__action_next[indices], self.__is_done[indices])
+
+    def update_priority(self, indices, errors):
+        """
+        優先度を更新
+        :param indices: 経験のインデックス
+        :param errors: TD誤差
+        :return: なし
+        """
+        self.__priority[indices] = np.abs(errors) + self.__priority_minimum
@@ -0,0 +1,159 @@
+import time
+
+from experience_buffer import ExperienceBuffer
+from play_stats import PlayStats
+
+
+class Runner:
+    def __init__(self, environment, players, is_stats=False, mode_status_id=False):
+        """
+        コンストラクタ
+        表示や経過表示を行わずに学習用のプレイを高速に実施する
+        エージェントの各処理(initialize, get_action, get_reward, get_q, adjust_experience, finalize)はControlと同様に呼び出す
+        :param environment: 環境
+        :param players: エージェントのリスト
+        :param is_stats: 処理ごとの処理時間を集計するかのフラグ
+        :param mode_status_id: エージェントに状態を状態ID(y座標 * 幅 + x座標)で渡すかのフラグ
+                               (経験には位置(x座標, y座標)で記録する)
+        """
+        self.__environment = environment
+        self.__players = players
+        self.__stats = PlayStats() if is_stats else None
+        self.__mode_status_id = mode_status_id
+        self.__count_step = 0
+        self.__count_episode = 0
+        self.__time_elapsed = 0.0
+
+    @property
+    def count_step(self):
+        """実施したステップ数(無効な行動を含む)"""
+        return self.__count_step
+
+    @property
+    def count_episode(self):
+        """実施したプレイ回数"""
+        return self.__count_episode
+
+    @property
+    def time_elapsed(self):
+        """プレイの経過時間の合計(秒)"""
+        return self.__time_elapsed
+
+    @property
+    def stats(self):
+        """処理ごとの呼び出し回数と処理時間の集計(PlayStats,集計しない場合はNone)"""
+        return self.__stats
+
+    @property
+    def steps_per_second(self):
+        """1秒あたりのステップ数"""
+        if self.__time_elapsed <= 0:
+            return 0.0
+
+        return self.__count_step / self.__time_elapsed
+
+    def reset(self):
+        """
+        ステップ数と経過時間の集計をクリア
+        :return: なし
+        """
+        self.__count_step = 0
+        self.__count_episode = 0
+        self.__time_elapsed = 0.0
+
+    def run(self, count=1, step_max=0):
+        """
+        プレイを実施
+        時間はプレイの開始時と終了時のみ計測する
+        :param count: プレイ回数
+        :param step_max: 最大ステップ数(全プレイヤーが1回ずつ行動して1ステップ,全プレイの合計,0の場合は制限なし)
+        :return: プレイを実施しての経験(各プレイヤーのExperienceBufferのリスト)
+        """
+        environment = self.__environment
+        players = self.__players
+        experience = [ExperienceBuffer() for j in range(len(players))]
+        stats = self.__stats
+        mode_status_id = self.__mode_status_id
+        # 集計しない場合は計測しない時計を使用する
+        clock = PlayStats.clock if stats is not None else PlayStats.clock_null
+
+        # 最大ステップ数は全プレイで共有する(Controlと同様)
+        step = step_max
+        for i in range(count):
+            time_start = time.monotonic()
+            environment.start()
+            for j in range(len(players)):
+                players[j].initialize()
+                experience[j].start_episode()
+
+            count_step = 0
+            j = 0
+            while True:
+                player = players[j]
+                # 行動前の状態と有効な行動リストを取得して行動を決定
+                status = environment.status_id if mode_status_id else environment.status
+                time_0 = clock()
+                actions_effective = environment.get_actions_effective()
+                time_1 = clock()
+                action = player.get_action(status, actions_effective)
+                time_2 = clock()
+                # 行動を実施
+                can_action = environment.set_action(action)
+                time_3 = clock()
+                status_next = environment.status_id if mode_status_id else environment.status
+                actions_effective_next = environment.get_actions_effective()
+                time_4 = clock()
+                is_play = environment.is_play
+                # 環境からの情報を通知
+                reward = player.get_reward(status, action, can_action, status_next, is_play, environment.score,
+                                           actions_effective_next)
+                time_5 = clock()
+                action_next = None
+                if player.mode_sarsa:
+                    # SARSAモードの場合は次回の行動を取得する
+                    action_next = player.get_action(status_next, actions_effective)
+                time_6 = clock()
+                q = player.get_q(status, action, status_next, action_next, reward)
+                time_7 = clock()
+                if mode_status_id:
+                    # 状態IDの場合は経験には位置で記録
+                    experience[j].append(environment.get_status(status), actions_effective, action,
+                                         environment.get_status(status_next), action_next,
+                                         actions_effective_next, reward, q, not is_play)
+                else:
+                    experience[j].append(status, actions_effective, action, status_next, action_next,
+                                         actions_effective_next, reward, q, not is_play)
+                if stats is not None:
+                    stats.add_step((time_0, time_1, time_2, time_3, time_4, time_5, time_6, time_7, clock()),
+                                   can_action, action_next is not None)
+                count_step += 1
+
+                if not can_action:
+                    # 行動が実行できなかった場合は同じプレイヤーが再度行動する
+                    continue
+
+                if not is_play:
+                    # プレイが終了した場合は経験を調整
+                    for k in range(len(players)):
+                        players[k].adjust_experience(experience[k][-1], environment.score)
+                    break
+
+                j = (j + 1) % len(players)
+                if (j == 0) and (0 < step_max):
+                    # 最大ステップ数の指定がある場合
+                    step -= 1
+                    if step <= 0:
+                        # 指定回数のステップの実行が終わった場合
+                        break
+
+            # 終了処理を実施
+            for j in range(len(players)):
+                players[j].finalize(environment.status_id if mode_status_id else environment.status, environment.score)
+
+            self.__time_elapsed += time.monotonic() - time_start
+            self.__count_step += count_step
+            self.__count_episode += 1
+            if stats is not None:
+                stats.add_episode()
+
+        return experience
@@ -0,0 +1,213 @@
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import shutil
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from experiment import Experiment
+
+
+def sweep_worker(config, directory_output):
+    """
+    ハイパーパラメーター探索のワーカー処理
+    ワーカープロセスで1つの設定の実験を実施する(標準出力は実験の出力ディレクトリのlog.txtに書き込む)
+    中断または失敗した実験の学習データを読み込んで途中から学習しないように,実験の出力ディレクトリは削除してから実施する
+    (成功した実験はワーカーに渡さないため削除しない)
+    :param config: 実験設定
+    :param directory_output: 出力先のディレクトリ
+    :return: 実験結果
+    """
+    experiment = Experiment(config, directory_output)
+    shutil.rmtree(experiment.directory, ignore_errors=True)
+    os.makedirs(experiment.directory, exist_ok=True)
+    with open(os.path.join(experiment.directory, 'log.txt'), 'w') as file, contextlib.redirect_stdout(file):
+        try:
+            return experiment.run()
+        except Exception as error:
+            traceback.print_exc(file=file)
+            return experiment.fail(error)
+
+
+class Sweep:
+    def __init__(self, config, directory_output='output'):
+        """
+        コンストラクタ
+        ハイパーパラメーターの組み合わせごとの実験を別々のプロセスで実施する
+        各実験のシードは基準のシード + 組み合わせの番号,学習データは実験ごとの出力ディレクトリに保存する
+        結果は実験が終わるごとに結果ファイル(JSON Lines)に追記し,再実行時は結果ファイルにある実験を実施しない
+        :param config: 探索設定
+                       {'name': 探索名,
+                        'base': 共通の実験設定,
+                        'seed': 基準のシード,
+                        'grid': {パラメーター名: 値のリスト}(全組み合わせを探索),
+                        'random': {'count': 試行回数,
+                                   'params': {パラメーター名: 値のリストまたは{'min', 'max', 'log', 'integer'}}}}
+                       パラメーター名は実験設定の項目名('epochs'など)またはエージェントの引数('agent.epsilon'など)
+        :param directory_output: 出力先のディレクトリ(この下に探索名のディレクトリを作成する)
+        """
+        self.__name = config.get('name', 'sweep')
+        self.__base = config.get('base', {})
+        self.__seed = config.get('seed', 0)
+        self.__grid = config.get('grid')
+        self.__random = config.get('random')
+        if (self.__grid is None) == (self.__random is None):
+            raise ValueError('gridとrandomのいずれか一方を指定してください')
+        self.__directory = os.path.join(directory_output, self.__name)
+
+    @property
+    def directory(self):
+        """探索の出力ディレクトリ"""
+        return self.__directory
+
+    @property
+    def path_results(self):
+        """結果ファイルのパス"""
+        return os.path.join(self.__directory, 'results.jsonl')
+
+    def get_params(self):
+        """
+        探索するパラメーターの組み合わせを取得
+        ランダム探索も探索設定のシードから生成するため,再実行しても同じ組み合わせとなる
+        :return: パラメーターの組み合わせ({パラメーター名: 値})のリスト
+        """
+        if self.__grid is not None:
+            # グリッド探索の場合
+            names = list(self.__grid)
+            return [dict(zip(names, values)) for values in itertools.product(*(self.__grid[name] for name in names))]
+
+        # ランダム探索の場合
+        random = np.random.RandomState(self.__seed)
+        params = list()
+        for i in range(self.__random['count']):
+            param = dict()
+            for name, space in self.__random['params'].items():
+                if isinstance(space, list):
+                    # 値のリストの場合
+                    param[name] = space[random.randint(len(space))]
+                elif space.get('integer', False):
+                    # 整数の範囲の場合
+                    param[name] = int(random.randint(space['min'], space['max'] + 1))
+                elif space.get('log', False):
+                    # 対数スケールの範囲の場合
+                    param[name] = float(np.exp(random.uniform(np.log(space['min']), np.log(space['max']))))
+                else:
+                    param[name] = float(random.uniform(space['min'], space['max']))
+            params.append(param)
+
+        return params
+
+    def get_configs(self):
+        """
+        パラメーターの組み合わせごとの実験設定を取得
+        :return: 実験設定のリスト
+        """
+        configs = list()
+        for i, param in enumerate(self.get_params()):
+            config = json.loads(json.dumps(self.__base))
+            config['agent'] = config.get('agent', {})
+            for name, value in param.items():
+                if name.startswith('agent.'):
+                    # エージェントの引数の場合
+                    config['agent'][name[len('agent.'):]] = value
+                else:
+                    config[name] = value
+            config['name'] = '{0}_{1:04d}'.format(self.__name, i)
+            config['seed'] = self.__seed + i
+            config['display_result'] = False
+            configs.append(config)
+
+        return configs
+
+    def load_results(self):
+        """
+        結果ファイルから実施済みの実験結果を読み込み
+        書き込み途中で中断した行は無視する
+        :return: {実験名: 実験結果}
+        """
+        results = dict()
+        if not os.path.exists(self.path_results):
+            return results
+
+        with open(self.path_results) as file:
+            for line in file:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue
+                results[result['name']] = result
+
+        return results
+
+    def run(self, count_worker=None):
+        """
+        探索を実施
+        成功した実験は再実行時に実施しない(失敗した実験は再実施する)
+        :param count_worker: ワーカー数(Noneの場合はCPU数)
+        :return: 今回実施した実験の結果のリスト
+        """
+        os.makedirs(self.__directory, exist_ok=True)
+        done = {name for name, result in self.load_results().items() if result['status'] == 'succeeded'}
+        configs = [config for config in self.get_configs() if config['name'] not in done]
+        print('探索：{0} 実施済み：{1} 実施予定：{2}'.format(self.__name, len(done), len(configs)))
+        if not configs:
+            return list()
+
+        if count_worker is None:
+            count_worker = os.cpu_count()
+        count_worker = max(1, min(count_worker, len(configs)))
+
+        if os.path.exists(self.path_results) and (0 < os.path.getsize(self.path_results)):
+            with open(self.path_results, 'rb') as file:
+                file.seek(-1, os.SEEK_END)
+                is_incomplete = file.read(1) != b'\n'
+            if is_incomplete:
+                # 書き込み途中で中断した行がある場合は改行して以降の結果と分ける
+                with open(self.path_results, 'a') as file:
+                    file.write('\n')
+
+        results = list()
+        # 実験ごとにTensorFlowなどの状態を持ち越さないように,ワーカープロセスは1実験ごとに作り直す
+        with ProcessPoolExecutor(count_worker, max_tasks_per_child=1) as executor, \
+                open(self.path_results, 'a') as file:
+            futures = {executor.submit(sweep_worker, config, self.__directory): config for config in configs}
+            for future in as_completed(futures):
+                config = futures[future]
+                try:
+                    result = future.result()
+                except Exception as error:
+                    # ワーカープロセスが異常終了した場合
+                    result = {'name': config['name'], 'status': 'failed',
+                              'error': '{0}: {1}'.format(type(error).__name__, error)}
+                result['config'] = config
+                # 中断しても完了した実験の結果が残るように1行ずつ書き込む
+                file.write(json.dumps(result, ensure_ascii=False) + '\n')
+                file.flush()
+                results.append(result)
+                print('{0} {1} 時間：{2} 方策の手数：{3}'.format(result['name'], result['status'],
+                                                          result.get('time_elapsed'), result.get('policy_length')))
+
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ハイパーパラメーターの組み合わせごとに並列で実験を実施する')
+    parser.add_argument('config', help='探索設定ファイル(JSON)のパス')
+    parser.add_argument('--output', default='output', help='出力先のディレクトリ')
+    parser.add_argument('--workers', type=int, help='ワーカー数(省略時はCPU数)')
+    args = parser.parse_args(argv)
+
+    with open(args.config) as file:
+        sweep = Sweep(json.load(file), args.output)
+    results = sweep.run(args.workers)
+
+    return 1 if any(result['status'] != 'succeeded' for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+import pytest
+
+from checkpoint_manager import CheckpointManager
+
+
+@pytest.mark.parametrize('is_background', [True, False])
+def test_save_round_trip(tmp_path, is_background):
+    """保存したテーブルと重みを読み込むと保存時点の値になり,一時ファイルは残らない"""
+    manager = CheckpointManager(str(tmp_path), interval=2, is_background=is_background)
+    table = np.arange(12, dtype=np.float64).reshape(3, 4)
+    weights = [np.ones((2, 3)), np.zeros(3)]
+    get_data = lambda: {'table.npy': table, 'weights.npz': weights}
+
+    # 保存間隔に達していない場合は保存しない
+    assert not manager.save(get_data)
+    assert manager.save(get_data)
+    # 保存後に元の配列を更新しても保存する値は変わらない
+    table[0, 0] = -1
+    manager.close()
+
+    np.testing.assert_array_equal(manager.load('table.npy'), np.arange(12).reshape(3, 4))
+    loaded = manager.load('weights.npz')
+    assert [array.shape for array in loaded] == [(2, 3), (3,)]
+    assert sorted(os.listdir(str(tmp_path))) == ['table.npy', 'weights.npz']
+
+    # 強制保存は保存間隔によらず上書きする
+    assert manager.save(get_data, force=True)
+    manager.close()
+    assert manager.load('table.npy')[0, 0] == -1
+
+
+def test_load_table_memmap(tmp_path):
+    """メモリマップのテーブルは更新がファイルに反映され,形状が異なる場合は作り直す"""
+    manager = CheckpointManager(str(tmp_path), is_background=False)
+    table = manager.load_table('q.npy', (2, 3), dtype=np.float32, fill=0.5, mode_memmap=True)
+    assert isinstance(table, np.memmap)
+    assert table.dtype == np.float32
+    table[1, 2] = 7
+    manager.save(lambda: {'q.npy': table}, force=True)
+    del table
+
+    loaded = manager.load_table('q.npy', (2, 3))
+    assert loaded.dtype == np.float64
+    assert loaded[1, 2] == 7 and loaded[0, 0] == 0.5
+    assert manager.load_table('q.npy', (3, 3), fill=1.0).tolist() == [[1.0] * 3] * 3
+    assert not os.path.exists(manager.get_path('q.npy.tmp'))
+
+
+def test_directory_is_absolute(tmp_path, monkeypatch):
+    """保存先のディレクトリは作成時のカレントディレクトリを基準とした絶対パスになる"""
+    monkeypatch.chdir(str(tmp_path))
+    manager = CheckpointManager('checkpoint')
+    monkeypatch.chdir('/')
+    assert manager.directory == os.path.join(str(tmp_path), 'checkpoint')
+    assert os.path.isdir(manager.directory)
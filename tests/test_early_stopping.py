@@ -0,0 +1,35 @@
+import numpy as np
+
+from early_stopping import EarlyStopping
+
+
+def test_policy_stable():
+    """方策が指定回数連続で変化しない場合に収束と判定し,変化した場合は回数をリセットする"""
+    stopping = EarlyStopping(count_policy_stable=2)
+    assert stopping.is_policy_required
+    assert stopping.update(np.array([0, 1, 2])) is None
+    assert stopping.update(np.array([0, 1, 2])) is None
+    assert stopping.update(np.array([0, 1, 3])) is None
+    assert stopping.count_stable == 0
+    assert stopping.update(np.array([0, 1, 3])) is None
+    assert stopping.update(np.array([0, 1, 3])) == 'policy_stable'
+
+
+def test_plateau():
+    """手数の平均が許容量を超えて減少しない状態が指定回数続いた場合に収束と判定する"""
+    stopping = EarlyStopping(count_plateau=2, tolerance_plateau=1.0)
+    assert not stopping.is_policy_required
+    # 方策は判定しないため無視する
+    assert stopping.update(np.array([0]), 50) is None
+    assert stopping.update(np.array([0]), 40) is None
+    assert stopping.update(None, 39.5) is None
+    assert stopping.count_not_improved == 1
+    assert stopping.update(None, None) is None
+    assert stopping.update(None, 39.5) == 'plateau'
+
+
+def test_disabled():
+    """回数が0の場合は判定しない"""
+    stopping = EarlyStopping()
+    for i in range(10):
+        assert stopping.update(np.zeros(3), 10) is None
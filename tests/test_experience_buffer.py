@@ -0,0 +1,73 @@
+import numpy as np
+
+from experience_buffer import ExperienceBuffer
+
+
+def append_steps(buffer, count, offset=0):
+    """
+    テスト用の経験を指定ステップ数追加
+    :param buffer: 経験(ExperienceBuffer)
+    :param count: ステップ数
+    :param offset: 報酬に加算する値
+    :return: なし
+    """
+    for i in range(count):
+        buffer.append((i, i + 1), [0, 2], i % 4, (i + 1, i), None if i % 2 else 1, [1, 3],
+                      offset + i, 0.5 * i, i == count - 1)
+
+
+def test_expand_keeps_episodes():
+    """容量を超えて拡張してもプレイごとの経験が保持される"""
+    buffer = ExperienceBuffer(capacity=2)
+    for episode in range(3):
+        buffer.start_episode()
+        append_steps(buffer, 5, offset=100 * episode)
+
+    assert buffer.count_step == 15
+    assert len(buffer) == 3
+    assert buffer.offsets.tolist() == [0, 5, 10]
+    episode = buffer[-1]
+    assert len(episode) == 5
+    assert episode['reward'].tolist() == [200, 201, 202, 203, 204]
+    assert episode['status'][4].tolist() == [4, 5]
+    assert episode['action_next'].tolist() == [1, -1, 1, -1, 1]
+    assert episode['is_done'].tolist() == [False, False, False, False, True]
+
+
+def test_mask_round_trip():
+    """有効行動リストはビットマスクで保持して行動ごとの有効性で取得できる"""
+    buffer = ExperienceBuffer()
+    buffer.start_episode()
+    append_steps(buffer, 1)
+
+    assert buffer.get_raw('actions_effective').tolist() == [0b0101]
+    assert buffer[0]['actions_effective'].tolist() == [[True, False, True, False]]
+    assert buffer[0]['actions_effective_next'].tolist() == [[False, True, False, True]]
+
+
+def test_extend():
+    """他の経験を結合するとプレイの開始位置がずれて追加される"""
+    buffer = ExperienceBuffer(capacity=1)
+    other = ExperienceBuffer(capacity=1)
+    buffer.start_episode()
+    append_steps(buffer, 3)
+    for episode in range(2):
+        other.start_episode()
+        append_steps(other, 2, offset=10 * (episode + 1))
+    buffer.extend(other)
+
+    assert buffer.offsets.tolist() == [0, 3, 5]
+    assert buffer[2]['reward'].tolist() == [20, 21]
+
+
+def test_get_return():
+    """割引報酬和はブロックの境界をまたいでも逐次計算と一致する"""
+    reward = np.random.RandomState(0).uniform(-1, 1, 3000)
+    for decay in (0.0, 0.5, 0.9, 0.99, 1.0):
+        expected = np.zeros(reward.shape[0])
+        carry = 0.0
+        for i in range(reward.shape[0] - 1, -1, -1):
+            carry = reward[i] + decay * carry
+            expected[i] = carry
+
+        np.testing.assert_allclose(ExperienceBuffer.get_return(reward, decay), expected, rtol=1e-9, atol=1e-9)
@@ -0,0 +1,56 @@
+import collections
+
+import numpy as np
+import pytest
+
+from maze_generator import MazeGenerator
+
+
+def get_reachable(maze):
+    """
+    スタート地点から到達できる状態IDを幅優先探索で取得
+    :param maze: 迷路
+    :return: 到達できる状態IDの集合
+    """
+    table = maze.status_next_id_table
+    start = maze.get_status_id(maze.status_start)
+    reachable = {start}
+    queue = collections.deque([start])
+    while queue:
+        for status_next in table[queue.popleft()].tolist():
+            if status_next not in reachable:
+                reachable.add(status_next)
+                queue.append(status_next)
+
+    return reachable
+
+
+@pytest.mark.parametrize('width, height', [(2, 2), (7, 3), (31, 17)])
+def test_perfect_maze(width, height):
+    """完全迷路は全マスがつながり,通路の数がマス数-1(ループがない)"""
+    maze = MazeGenerator(seed=0).create(width, height)
+    assert (maze.width, maze.height) == (width, height)
+    assert maze.actions_effective_table.shape == (height, width, 4)
+    assert len(get_reachable(maze)) == width * height
+    assert maze.actions_effective_table.sum() // 2 == width * height - 1
+    assert list(maze.status_goal) == [width - 1, height - 1]
+
+
+def test_braid_and_seed():
+    """行き止まりを取り除くと通路が増え,同じシードでは同じ迷路を生成する"""
+    perfect = MazeGenerator(seed=1).create(20, 20)
+    braid = MazeGenerator(seed=1).create(20, 20, braid=1.0)
+    assert len(get_reachable(braid)) == 400
+    assert braid.actions_effective_table.sum() > perfect.actions_effective_table.sum()
+    np.testing.assert_array_equal(MazeGenerator(seed=1).create(20, 20).wall_vertical, perfect.wall_vertical)
+
+
+def test_invalid_arguments():
+    """サイズが2未満やスタート地点,ゴール地点が範囲外の場合は例外とする"""
+    generator = MazeGenerator(seed=0)
+    with pytest.raises(ValueError):
+        generator.create(1, 5)
+    with pytest.raises(ValueError):
+        generator.create(5, 5, start=(5, 0))
+    with pytest.raises(ValueError):
+        generator.create(5, 5, goal=(0, -1))
@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pytest
+
+from metrics_log import MetricsLog, RollingWindow
+
+
+def test_rolling_window_wraparound():
+    """ウィンドウを超えて追加しても統計量は直近の値のみから算出する"""
+    values = np.random.RandomState(0).uniform(0, 100, 257)
+    window = RollingWindow(10)
+    assert window.mean is None and window.min is None and window.percentile(50) is None
+    for i, value in enumerate(values):
+        window.append(value)
+        recent = values[max(0, i - 9):i + 1]
+        assert len(window) == len(recent)
+        assert window.mean == pytest.approx(recent.mean())
+        assert window.min == recent.min()
+    assert window.count == 257
+    assert window.last == values[-1]
+    assert window.percentile(90) == pytest.approx(np.percentile(values[-10:], 90))
+
+    with pytest.raises(ValueError):
+        RollingWindow(0)
+
+
+def test_curve_thinning():
+    """推移は最大件数を超えると間隔を倍にして間引き,常に間隔の倍数番目の値を保持する"""
+    log = MetricsLog(size_curve=4)
+    for i in range(37):
+        log.add(i, count_to_goal=i)
+        assert len(log.curve) <= 4
+        assert log.curve == list(range(0, i + 1, log.interval_curve))
+    assert log.interval_curve == 16
+    # ゴールまでの手数がない記録は推移に含めない
+    log.add(37)
+    assert log.curve == [0, 16, 32]
+
+
+def test_jsonl_output(tmp_path):
+    """記録をまとめて書き込み,有限でない損失はnullとして書き込む"""
+    path = str(tmp_path / 'metrics.jsonl')
+    with MetricsLog(path, size_window=3, size_buffer=2) as log:
+        log.add(0, count_to_goal=10, time_fit=0.5, loss=np.float32(0.25))
+        with open(path, encoding='utf-8') as file:
+            assert file.read() == ''
+        log.add(1, count_to_goal=20, loss=float('nan'), epsilon=0.1)
+        log.add(2)
+        summary = log.get_summary()
+    with open(path, encoding='utf-8') as file:
+        records = [json.loads(line) for line in file]
+
+    assert [record['loop'] for record in records] == [0, 1, 2]
+    assert records[0]['loss'] == 0.25 and records[1]['loss'] is None
+    assert records[1]['epsilon'] == 0.1
+    assert summary['count'] == 2 and summary['mean'] == 15 and summary['min'] == 10
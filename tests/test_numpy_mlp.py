@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from numpy_mlp import NumpyMLP
+
+SIZES = [4, 16, 8, 3]
+
+
+def test_shapes_and_training():
+    """推論と学習の入出力の形状が正しく,学習で損失が減少する"""
+    np.random.seed(0)
+    model = NumpyMLP(SIZES, learning_rate=0.01)
+    x = np.random.uniform(-1, 1, (32, SIZES[0]))
+    y = x[:, :SIZES[-1]] * 2
+
+    assert model.predict(x).shape == (32, SIZES[-1])
+    np.testing.assert_array_equal(model.predict_on_batch(x), model.predict(x))
+    # 出力数が1の場合は教師データは(データ数)の形状も受け付ける
+    assert isinstance(NumpyMLP(SIZES[:-1] + [1]).train_on_batch(x, x[:, 0], sample_weight=np.ones(32)), float)
+    loss_first = NumpyMLP(SIZES).train_on_batch(x, y)
+    history = model.fit(x, y, epochs=200, batch_size=8, verbose=0)
+    assert len(history.history['loss']) == 200
+    assert history.history['loss'][-1] < loss_first
+
+
+def test_weights_round_trip():
+    """取得した重みを設定すると同じ推論結果になり,形状が異なる重みは設定できない"""
+    model = NumpyMLP(SIZES)
+    other = NumpyMLP(SIZES)
+    other.set_weights(model.get_weights())
+    x = np.random.uniform(-1, 1, (5, SIZES[0]))
+    np.testing.assert_array_equal(other.predict(x), model.predict(x))
+
+    with pytest.raises(ValueError):
+        other.set_weights(model.get_weights()[:-1])
+    with pytest.raises(ValueError):
+        other.set_weights([weight.T for weight in model.get_weights()])
+
+
+def test_weights_match_keras():
+    """重みの形状と推論結果がtf.kerasの同じ構成のモデルと一致する"""
+    tf = pytest.importorskip('tensorflow')
+    layers = [tf.keras.layers.Dense(SIZES[1], input_shape=(SIZES[0], ), activation='relu')]
+    layers += [tf.keras.layers.Dense(size, activation='relu') for size in SIZES[2:-1]]
+    layers.append(tf.keras.layers.Dense(SIZES[-1]))
+    keras = tf.keras.models.Sequential(layers)
+    model = NumpyMLP(SIZES)
+
+    assert [weight.shape for weight in model.get_weights()] == [weight.shape for weight in keras.get_weights()]
+    model.set_weights(keras.get_weights())
+    x = np.random.uniform(-1, 1, (5, SIZES[0])).astype(np.float32)
+    np.testing.assert_allclose(model.predict(x), keras.predict_on_batch(x), rtol=1e-4, atol=1e-5)
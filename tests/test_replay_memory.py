@@ -0,0 +1,56 @@
+import numpy as np
+
+from replay_memory import ReplayMemory
+
+
+def add_steps(memory, begin, count):
+    """
+    テスト用の経験を追加(報酬に通し番号を設定)
+    :param memory: メモリ(ReplayMemory)
+    :param begin: 通し番号の開始値
+    :param count: 経験の数
+    :return: なし
+    """
+    reward = np.arange(begin, begin + count, dtype=np.float64)
+    status = np.stack([reward, reward], axis=1).astype(np.int64)
+    memory.add(status, np.zeros(count, dtype=np.int64), reward, status, np.zeros(count, dtype=np.int64),
+               np.zeros(count, dtype=bool))
+
+
+def test_ring_wraparound():
+    """容量を超えると古い経験から上書きされる"""
+    memory = ReplayMemory(capacity=5)
+    add_steps(memory, 0, 3)
+    assert len(memory) == 3
+    add_steps(memory, 3, 4)
+    assert len(memory) == 5
+
+    indices, weights, status, action, reward, *_ = memory.sample(200)
+    assert set(reward.tolist()) == {2.0, 3.0, 4.0, 5.0, 6.0}
+    # 位置0と1は通し番号5と6で上書きされている
+    assert sorted(set(zip(indices.tolist(), reward.tolist())))[:2] == [(0, 5.0), (1, 6.0)]
+
+    # 容量より多い経験を一度に追加した場合は新しい経験のみが残る
+    add_steps(memory, 100, 12)
+    assert len(memory) == 5
+    assert set(memory.sample(200)[4].tolist()) == {107.0, 108.0, 109.0, 110.0, 111.0}
+
+
+def test_update_priority():
+    """優先度を更新するとサンプリング確率と補正用の重みに反映される"""
+    np.random.seed(0)
+    memory = ReplayMemory(capacity=4, alpha=1.0, beta=1.0, priority_minimum=0.0)
+    add_steps(memory, 0, 4)
+    memory.update_priority(np.arange(4), np.array([0.0, 0.0, -3.0, 1.0]))
+
+    indices, weights, *_ = memory.sample(1000)
+    assert set(indices.tolist()) == {2, 3}
+    assert 0.6 < np.mean(indices == 2) < 0.9
+    assert weights.max() == 1.0
+    # 確率が高い経験ほど重みは小さい
+    assert np.allclose(weights[indices == 2], 1 / 3)
+
+    # 追加した経験は最大の優先度でサンプリングされる
+    add_steps(memory, 10, 1)
+    indices = memory.sample(1000)[0]
+    assert 0.3 < np.mean(indices == 0) < 0.6